@@ -0,0 +1,61 @@
+"""
+Measure the cold-import cost of each data_explorer entry point.
+
+Every measurement is made in a fresh interpreter so nothing is already in
+sys.modules. Run from the repository root:
+
+    python benchmarks/import_time.py [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = ['DatabaseExtension', 'DatabaseExplorer', 'ExperimentExplorer']
+
+# Heavy modules whose presence after import is reported
+HEAVY_MODULES = ['cosima_cookbook', 'ipywidgets', 'pandas', 'sqlalchemy', 'xarray']
+
+TIMER = """
+import sys, time
+t0 = time.perf_counter()
+from data_explorer import {name}
+elapsed = time.perf_counter() - t0
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ','.join(loaded))
+"""
+
+def time_import(name, repeat, cwd):
+    """
+    Return a list of wall clock import times in seconds for name, and the
+    heavy modules it pulled in
+    """
+    times = []
+    loaded = ''
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', TIMER.format(name=name, heavy=HEAVY_MODULES)],
+                             cwd=cwd, check=True, capture_output=True, text=True).stdout.split()
+        times.append(float(out[0]))
+        loaded = out[1] if len(out) > 1 else ''
+    return times, loaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Number of cold imports per entry point')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    print('{:<20} {:>10} {:>10}  {}'.format('entry point', 'median/s', 'min/s', 'heavy modules loaded'))
+    for name in ENTRY_POINTS:
+        try:
+            times, loaded = time_import(name, args.repeat, root)
+        except subprocess.CalledProcessError as e:
+            print('{:<20} failed: {}'.format(name, e.stderr.strip().splitlines()[-1]))
+            continue
+        print('{:<20} {:>10.3f} {:>10.3f}  {}'.format(name, statistics.median(times), min(times), loaded or '-'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Explore COSIMA Cookbook databases from a notebook.
+
+The catalog and query logic lives in :mod:`data_explorer.database` and does
+not require ipywidgets. The widget classes in :mod:`data_explorer.explorer`
+are only imported when one of them is first accessed, so
+
+    from data_explorer import DatabaseExtension
+
+does not pay the cost of importing ipywidgets.
+"""
+import importlib
+
+# Public name -> submodule that defines it. Submodules are imported lazily
+# on first attribute access (PEP 562)
+_lazy_attributes = {
+    'DatabaseExtension': 'database',
+    'return_value_or_empty': 'database',
+    'ExperimentCatalog': 'catalog',
+    'VariableCatalog': 'catalog',
+    'CoverageIndex': 'catalog',
+    'VariableOverlap': 'catalog',
+    'load_selection': 'loading',
+    'load_ensemble': 'ensemble',
+    'job_spec': 'batch',
+    'save_job': 'batch',
+    'run_jobs': 'batch',
+    'StagingCache': 'cache',
+    'ClusterManager': 'cluster',
+    'Prefetcher': 'prefetch',
+    'FilePool': 'filepool',
+    'shared_pool': 'filepool',
+    'VariableSelector': 'explorer',
+    'VariableSelectorInfo': 'explorer',
+    'VariableSelectFilter': 'explorer',
+    'ClusterStatus': 'explorer',
+    'DatabaseExplorer': 'explorer',
+    'ExperimentExplorer': 'explorer',
+    'VariableExplorer': 'explorer',
+}
+
+__all__ = list(_lazy_attributes)
+
+def __getattr__(name):
+    try:
+        module = _lazy_attributes[name]
+    except KeyError:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name)) from None
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    # Cache so subsequent lookups bypass __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
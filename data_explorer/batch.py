@@ -0,0 +1,298 @@
+"""
+Run large extractions as batch jobs outside the notebook kernel.
+
+A job spec is a dict describing one extraction, as saved by the Save job
+button of ExperimentExplorer:
+
+    {
+        "name": "01deg_jra55v13_iaf_temp_1_monthly_3f2a9c1e",
+        "database": "/path/to/cosima_master.db",
+        "experiment": "01deg_jra55v13_iaf",
+        "variables": ["temp"],
+        "frequency": "1 monthly",
+        "start_time": "1980-01-01 00:00:00",
+        "end_time": "2010-12-31 00:00:00",
+        "chunks": {"time": 1, "st_ocean": 7, "yt_ocean": 300, "xt_ocean": 400},
+        "isel": {"st_ocean": [0, 1]}
+    }
+
+database is the path of an sqlite database. Other databases are given as
+"database_url", an SQLAlchemy URL without a password.
+
+Job specs are stored as a JSON list. Each job is split into one task per
+variable and year, which run in parallel in a process pool and are each
+written to their own netCDF file or Zarr store. Outputs are written to a
+temporary path and moved into place when complete, so an interrupted run
+can be restarted and only the missing tasks are run again. The spec of each
+job is saved with its outputs, and a job whose spec has changed since its
+outputs were written is not run.
+
+Run from the command line with
+
+    python -m data_explorer.batch jobs.json output_dir --workers 8
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+
+# Keys of a job spec which determine its outputs
+_output_keys = ('experiment', 'variables', 'frequency', 'start_time', 'end_time', 'chunks', 'isel')
+
+def database_spec(session):
+    """
+    Return the job spec keys which identify the database behind session:
+    database, the path, for an sqlite database, otherwise database_url, the
+    URL without its password
+    """
+    from sqlalchemy.engine import URL
+
+    url = session.get_bind().url
+    if url.drivername.startswith('sqlite'):
+        return {'database': url.database}
+    url = URL.create(url.drivername, username=url.username, host=url.host, port=url.port,
+                     database=url.database, query=url.query)
+    return {'database_url': url.render_as_string(hide_password=False)}
+
+def spec_hash(spec):
+    """
+    Return a short hash of the keys of spec which determine its outputs
+    """
+    text = json.dumps([spec.get(key) for key in _output_keys], sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:8]
+
+def job_spec(selection, database=None, variables=None, name=None, database_url=None):
+    """
+    Return a job spec for a selection, see data_explorer.loading, from the
+    database file database or the database at database_url. variables, a
+    list of variable names, defaults to the variable of the selection. name
+    defaults to the experiment, variables and frequency followed by a short
+    hash of the selection, so different selections of the same variable are
+    different jobs
+    """
+    if variables is None:
+        variables = [selection['variable']]
+
+    spec = {'name': name, 'database': database, 'variables': list(variables)}
+    if database_url is not None:
+        spec['database_url'] = database_url
+    for key in ('experiment', 'frequency', 'start_time', 'end_time', 'chunks', 'isel'):
+        spec[key] = selection.get(key)
+
+    if name is None:
+        name = '_'.join([selection['experiment']] + list(variables) +
+                        [str(selection['frequency']), spec_hash(spec)])
+        spec['name'] = re.sub(r'[^\w.-]+', '_', name)
+    return spec
+
+def load_jobs(path):
+    """
+    Return the list of job specs in the JSON file at path, or an empty list
+    if it does not exist
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save_job(path, spec):
+    """
+    Append a job spec to the JSON file at path. A job with the same name and
+    the same outputs is replaced. Raises ValueError if a job with the same
+    name has different outputs
+    """
+    jobs = load_jobs(path)
+    for job in jobs:
+        if job['name'] == spec['name'] and spec_hash(job) != spec_hash(spec):
+            raise ValueError('A different job named {} is already in {}'.format(spec['name'], path))
+    jobs = [job for job in jobs if job['name'] != spec['name']]
+    jobs.append(spec)
+
+    tmp = '{}.tmp-{}'.format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(jobs, f, indent=2)
+    os.replace(tmp, path)
+
+def year_ranges(start_time, end_time):
+    """
+    Return a list of (start, end) time strings splitting start_time to
+    end_time at year boundaries. The years are parsed from the strings, so
+    this works for any model calendar. If they cannot be parsed the whole
+    range is returned
+    """
+    match_start = re.match(r'^\s*(\d+)-', str(start_time))
+    match_end = re.match(r'^\s*(\d+)-', str(end_time))
+    if match_start is None or match_end is None:
+        return [(start_time, end_time)]
+
+    first, last = int(match_start.group(1)), int(match_end.group(1))
+    ranges = []
+    for year in range(first, last + 1):
+        start = start_time if year == first else '{:04d}-01-01 00:00:00'.format(year)
+        end = end_time if year == last else '{:04d}-12-31 23:59:59'.format(year)
+        ranges.append((start, end))
+    return ranges
+
+def job_tasks(spec, output_dir, format='netcdf', split='year'):
+    """
+    Return a list of tasks for a job spec, one per variable and, if split is
+    'year', per year. Each task is a dict of the database, the selection to
+    load and the output path
+    """
+    if split == 'year':
+        ranges = year_ranges(spec['start_time'], spec['end_time'])
+    else:
+        ranges = [(spec['start_time'], spec['end_time'])]
+
+    extension = '.zarr' if format == 'zarr' else '.nc'
+
+    tasks = []
+    for variable in spec['variables']:
+        directory = os.path.join(output_dir, spec['name'], variable)
+        for start, end in ranges:
+            label = '{}_{}'.format(str(start)[:10], str(end)[:10])
+            tasks.append({
+                'database': spec.get('database'),
+                'database_url': spec.get('database_url'),
+                'selection': {
+                    'experiment': spec['experiment'],
+                    'variable': variable,
+                    'frequency': spec['frequency'],
+                    'start_time': start,
+                    'end_time': end,
+                    'chunks': spec.get('chunks'),
+                    'isel': spec.get('isel'),
+                },
+                'output': os.path.join(directory, '{}_{}{}'.format(variable, label, extension)),
+            })
+    return tasks
+
+def run_task(task):
+    """
+    Load the selection of task and write it to its output path. Runs in a
+    worker process, so opens its own database session
+    """
+    import cosima_cookbook as cc
+    from .loading import load_selection
+
+    output = task['output']
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    tmp = '{}.tmp-{}'.format(output, os.getpid())
+
+    if task.get('database_url') is not None:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+        session = Session(bind=create_engine(task['database_url']))
+    elif task['database'] is None:
+        session = cc.database.create_session()
+    else:
+        session = cc.database.create_session(task['database'])
+
+    try:
+        data = load_selection(session, task['selection'])
+        ds = data.to_dataset(name=task['selection']['variable'])
+        # Encoding from the source files is not always valid for the output
+        for v in ds.variables.values():
+            v.encoding = {}
+
+        if output.endswith('.zarr'):
+            shutil.rmtree(tmp, ignore_errors=True)
+            ds.chunk({dim: max(c) for dim, c in ds.chunks.items()}).to_zarr(tmp, mode='w')
+        else:
+            ds.to_netcdf(tmp)
+        os.replace(tmp, output)
+    finally:
+        session.close()
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+
+    return output
+
+def check_outputs(spec, output_dir):
+    """
+    Save spec with the outputs of the job below output_dir, or if it was
+    saved by an earlier run check it has the same outputs. Raises ValueError
+    if the outputs are from a different spec
+    """
+    directory = os.path.join(output_dir, spec['name'])
+    path = os.path.join(directory, 'job.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if spec_hash(previous) != spec_hash(spec):
+            raise ValueError('Outputs in {} are from a different job spec, remove them or '
+                             'rename the job'.format(directory))
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    tmp = '{}.tmp-{}'.format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(spec, f, indent=2)
+    os.replace(tmp, path)
+
+def run_jobs(jobs, output_dir, max_workers=None, format='netcdf', split='year'):
+    """
+    Run job specs, a list of dicts or the path to a JSON file of them, in
+    parallel in a pool of max_workers processes, writing results below
+    output_dir in format, 'netcdf' or 'zarr'. Tasks whose output already
+    exists are skipped, so a failed run can be restarted. Jobs whose spec
+    has changed since their outputs were written are not run, see
+    check_outputs.
+
+    Returns a tuple of the list of outputs written and a dict of output path,
+    or job output directory, to error message for tasks which failed
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if isinstance(jobs, str):
+        jobs = load_jobs(jobs)
+
+    written = []
+    failures = {}
+
+    tasks = []
+    for spec in jobs:
+        try:
+            check_outputs(spec, output_dir)
+        except ValueError as e:
+            failures[os.path.join(output_dir, spec['name'])] = str(e)
+            continue
+        tasks.extend(task for task in job_tasks(spec, output_dir, format, split)
+                     if not os.path.exists(task['output']))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {task['output']: executor.submit(run_task, task) for task in tasks}
+        for output, future in futures.items():
+            try:
+                written.append(future.result())
+            except Exception as e:
+                failures[output] = '{}: {}'.format(type(e).__name__, e)
+
+    return written, failures
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run data_explorer batch extraction jobs')
+    parser.add_argument('jobs', help='JSON file of job specs')
+    parser.add_argument('output_dir', help='Directory to write results to')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes, default the number of cpus')
+    parser.add_argument('--format', choices=['netcdf', 'zarr'], default='netcdf')
+    parser.add_argument('--split', choices=['year', 'none'], default='year',
+                        help='Split each job into one task per year')
+    args = parser.parse_args()
+
+    written, failures = run_jobs(args.jobs, args.output_dir, args.workers, args.format, args.split)
+
+    print('Wrote {} outputs'.format(len(written)))
+    for output, error in sorted(failures.items()):
+        print('Failed {}: {}'.format(output, error))
+    if failures:
+        print('Run again to retry failed tasks')
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Local staging cache for loaded data.
+
+Selections read from a slow shared filesystem are written to a chunked Zarr
+store in a local directory, keyed by the selection and a fingerprint of the
+database. Later loads of the same selection are read from local storage.
+The cache directory is bounded in size and the least recently used entries
+are evicted first. Entries handed out by get or put are read lazily, so they
+are held, and never evicted, until they are released.
+"""
+from collections import Counter
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Name of the marker file written once an entry is complete. Entries without
+# it are partial writes and are never read
+_complete = '.complete'
+
+# Suffix of the temporary directories entries are written to
+_temporary = '.tmp'
+
+def directory_size(path):
+    """
+    Return the total size in bytes of all files below path
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+def newest_mtime(path):
+    """
+    Return the latest modification time of path and all files below it
+    """
+    newest = os.path.getmtime(path)
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                newest = max(newest, os.path.getmtime(os.path.join(root, f)))
+            except OSError:
+                pass
+    return newest
+
+class StagingCache:
+    """
+    Size bounded cache of loaded DataArrays stored as Zarr in directory
+    """
+
+    def __init__(self, directory=None, max_size=50 * 2**30, chunk_size=100 * 2**20,
+                 stale_age=24 * 3600):
+        """
+        directory defaults to ~/.cache/data_explorer/staging. max_size is the
+        maximum total size of the cache in bytes and chunk_size the target size
+        in bytes of each Zarr chunk. Partial writes not modified for stale_age
+        seconds, left by a crashed write, are removed
+        """
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'), '.cache', 'data_explorer', 'staging')
+        self.directory = directory
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.stale_age = stale_age
+        os.makedirs(self.directory, exist_ok=True)
+        # Number of times each key has been handed out and not released
+        self._held = Counter()
+        # Caches are shared between threads, e.g. by the prefetcher and
+        # ensemble loads
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def key(selection, fingerprint=''):
+        """
+        Return a cache key for a selection dict and database fingerprint
+        """
+        text = json.dumps([selection, fingerprint], sort_keys=True, default=str)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.zarr')
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self.path(key), _complete))
+
+    def get(self, key, hold=True):
+        """
+        Return the DataArray stored under key, or None if it is not cached.
+        The DataArray reads from the cache lazily, so unless hold is False
+        the entry is held, and not evicted, until it is released
+        """
+        import xarray as xr
+
+        with self._lock:
+            if key not in self:
+                return None
+
+            path = self.path(key)
+            # Record the access for least recently used eviction
+            os.utime(path)
+            ds = xr.open_zarr(path)
+            if hold:
+                self._held[key] += 1
+            return ds[ds.attrs['staged_variable']]
+
+    def release(self, keys):
+        """
+        Release entries handed out by get or put, so they can be evicted
+        once no longer needed. keys is an iterable of keys, each released
+        once
+        """
+        with self._lock:
+            for key in keys:
+                if self._held[key] > 1:
+                    self._held[key] -= 1
+                else:
+                    self._held.pop(key, None)
+
+    def held(self):
+        """
+        Return the set of keys handed out and not released
+        """
+        with self._lock:
+            return set(self._held)
+
+    def put(self, key, data, hold=True):
+        """
+        Write the DataArray data to the cache under key, evicting old entries
+        if the cache is too large. Returns the DataArray read back from the
+        cache so later computation reads from local storage, held as for get
+        """
+        # Each write has its own temporary directory, as the same key may be
+        # staged concurrently by several threads or processes
+        tmp = tempfile.mkdtemp(prefix=key + '.zarr.', suffix=_temporary, dir=self.directory)
+        try:
+            self._write(tmp, data)
+            with self._lock:
+                # Keys identify the data, so if another writer finished
+                # first its entry is used rather than replaced, as it may
+                # already be in use
+                if key not in self:
+                    path = self.path(key)
+                    shutil.rmtree(path, ignore_errors=True)
+                    os.replace(tmp, path)
+                # Open the entry before evicting, so it is held
+                data = self.get(key, hold=hold)
+                self.evict(keep=key)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        return data
+
+    def _write(self, path, data):
+        """
+        Write the DataArray data as a complete Zarr entry at path
+        """
+        name = data.name if data.name is not None else 'data'
+        ds = data.to_dataset(name=name)
+        ds.attrs['staged_variable'] = name
+
+        # Encoding from the source netCDF files, e.g. chunksizes and
+        # compression, is not valid for Zarr
+        for v in ds.variables.values():
+            v.encoding = {}
+
+        ds = ds.chunk(self._chunks(data))
+        ds.to_zarr(path, mode='w', consolidated=True)
+        open(os.path.join(path, _complete), 'w').close()
+
+    def _chunks(self, data):
+        """
+        Return uniform chunks for data, as Zarr requires. Keep the existing
+        chunk sizes for all but the first dimension, usually time, and make
+        the first dimension chunks approximately chunk_size bytes
+        """
+        if data.ndim == 0:
+            return {}
+
+        if data.chunks is not None:
+            chunks = {dim: max(c) for dim, c in zip(data.dims, data.chunks)}
+        else:
+            chunks = dict(zip(data.dims, data.shape))
+
+        first = data.dims[0]
+        other = data.dtype.itemsize
+        for dim in data.dims[1:]:
+            other *= chunks[dim]
+        chunks[first] = int(min(data.shape[0], max(1, self.chunk_size // max(other, 1))))
+
+        return chunks
+
+    def entries(self):
+        """
+        Return a list of (last access time, size, key) of complete entries,
+        least recently used first
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.zarr'):
+                continue
+            key = name[:-len('.zarr')]
+            if key not in self:
+                continue
+            path = self.path(key)
+            entries.append((os.path.getmtime(path), directory_size(path), key))
+        return sorted(entries)
+
+    def temporaries(self):
+        """
+        Return a list of (last modification time, size, path) of the
+        temporary directories of writes in progress or left by a crashed
+        write
+        """
+        temporaries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(_temporary) and os.path.isdir(path):
+                try:
+                    temporaries.append((newest_mtime(path), directory_size(path), path))
+                except OSError:
+                    # Finished or removed while being listed
+                    continue
+        return sorted(temporaries)
+
+    def size(self):
+        """
+        Return the total size in bytes of the cache, including partial writes
+        """
+        return (sum(size for _, size, _ in self.entries()) +
+                sum(size for _, size, _ in self.temporaries()))
+
+    def remove_stale(self):
+        """
+        Remove the temporary directories of writes not modified for
+        stale_age seconds, which were left by a crashed write. Returns the
+        number of bytes removed
+        """
+        removed = 0
+        now = time.time()
+        for mtime, size, path in self.temporaries():
+            if now - mtime > self.stale_age:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += size
+        return removed
+
+    def evict(self, keep=None):
+        """
+        Remove stale partial writes, then least recently used entries until
+        the cache, including writes in progress, is no larger than max_size.
+        The entry keep and entries which are held are never removed, so the
+        cache may be larger than max_size while they are in use
+        """
+        with self._lock:
+            self.remove_stale()
+            entries = self.entries()
+            total = (sum(size for _, size, _ in entries) +
+                     sum(size for _, size, _ in self.temporaries()))
+            for _, size, key in entries:
+                if total <= self.max_size:
+                    break
+                if key == keep or key in self._held:
+                    continue
+                shutil.rmtree(self.path(key), ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        """
+        Remove all entries which are not held and stale partial writes
+        """
+        with self._lock:
+            self.remove_stale()
+            for _, _, key in self.entries():
+                if key not in self._held:
+                    shutil.rmtree(self.path(key), ignore_errors=True)
+
+    def __repr__(self):
+        return '{}({!r}, max_size={})'.format(type(self).__name__, self.directory, self.max_size)
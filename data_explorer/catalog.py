@@ -0,0 +1,477 @@
+"""
+Indexed views of experiment, variable and file tables.
+
+The widgets respond to selection events by looking up a single experiment or
+(variable, frequency) row. Scanning a DataFrame with a boolean mask for every
+event gets slower as the catalog grows, so these classes build dictionary
+indexes and sort keys once, when the tables are created, and every lookup
+after that is O(1). CoverageIndex does the same for the time intervals
+covered by the files of each experiment.
+"""
+
+class ExperimentCatalog:
+    """
+    Index of an experiment table, as returned by
+    cosima_cookbook.querying.get_experiments, by experiment name.
+    Optionally also indexes which experiments contain each variable, using
+    the experiment/variable map from DatabaseExtension.
+    """
+
+    def __init__(self, experiments, expt_variable_map=None):
+        self.frame = experiments
+
+        names = list(experiments.experiment)
+        self._position = {name: i for i, name in enumerate(names)}
+
+        # Precomputed case insensitive sort order, so sorting a subset of
+        # experiments compares integers rather than re-folding strings
+        self.names = sorted(names, key=str.casefold)
+        self._rank = {name: i for i, name in enumerate(self.names)}
+
+        self._variable_experiments = {}
+        if expt_variable_map is not None:
+            expts = expt_variable_map.index.get_level_values(0)
+            for expt, name in zip(expts, expt_variable_map.name):
+                self._variable_experiments.setdefault(name, set()).add(expt)
+
+    def __contains__(self, experiment):
+        return experiment in self._position
+
+    def __len__(self):
+        return len(self._position)
+
+    def get(self, experiment):
+        """
+        Return a single row DataFrame for experiment, or an empty DataFrame
+        if it is not in the catalog
+        """
+        position = self._position.get(experiment)
+        if position is None:
+            return self.frame.iloc[[]]
+        return self.frame.iloc[[position]]
+
+    def record(self, experiment):
+        """
+        Return the metadata for experiment as a dict, or None if it is not in
+        the catalog
+        """
+        position = self._position.get(experiment)
+        if position is None:
+            return None
+        return self.frame.iloc[position].to_dict()
+
+    def sort(self, experiments):
+        """
+        Return experiments as a list sorted case insensitively. Experiments
+        not in the catalog are placed at the end
+        """
+        last = len(self._rank)
+        return sorted(experiments, key=lambda name: self._rank.get(name, last))
+
+    def with_variable(self, variable):
+        """
+        Return the set of experiments which contain variable
+        """
+        return self._variable_experiments.get(variable, set())
+
+class VariableCatalog:
+    """
+    Index of a variable table by name and by (name, frequency). The table
+    must have a name column. If it has a frequency column the frequencies of
+    each variable are indexed in the order they appear in the table.
+    """
+
+    def __init__(self, variables):
+        self.frame = variables
+
+        self._frequencies = {}
+        self._rows = {}
+
+        if 'frequency' not in variables.columns:
+            for name in variables.name:
+                self._frequencies.setdefault(name, [])
+            return
+
+        for row in variables.to_dict('records'):
+            key = (row['name'], row['frequency'])
+            frequencies = self._frequencies.setdefault(row['name'], [])
+            if key not in self._rows:
+                frequencies.append(row['frequency'])
+                self._rows[key] = row
+
+    def __contains__(self, name):
+        return name in self._frequencies
+
+    def frequencies(self, name):
+        """
+        Return a list of the frequencies available for variable name
+        """
+        return list(self._frequencies.get(name, []))
+
+    def get(self, name, frequency):
+        """
+        Return the row for variable name at frequency as a dict, or None if
+        there is no such variable
+        """
+        return self._rows.get((name, frequency))
+
+# Approximate length in days of the frequency units used in the database,
+# e.g. '1 monthly', '3 hourly'
+_frequency_days = {
+    'hourly': 1 / 24,
+    'daily': 1.,
+    'monthly': 365.25 / 12,
+    'yearly': 365.25,
+}
+
+# Month lengths of the calendars used by the models. The database does not
+# record the calendar of each file, so adjacency of files is tested in all
+# of them
+_month_lengths = {
+    'noleap': [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+    'proleptic_gregorian': [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+    '360_day': [30] * 12,
+}
+
+def frequency_period(frequency):
+    """
+    Return the approximate sampling period in years of a frequency string
+    such as '1 monthly', or None if it is not recognised
+    """
+    days = frequency_days(frequency)
+    if days is None:
+        return None
+    return days / 365.25
+
+def frequency_days(frequency):
+    """
+    Return the approximate sampling period in days of a frequency string
+    such as '1 monthly', or None if it is not recognised
+    """
+    try:
+        count, unit = str(frequency).split()
+        return int(count) * _frequency_days[unit]
+    except (ValueError, KeyError):
+        return None
+
+def time_fields(times):
+    """
+    Parse a Series of date strings, 'YYYY-MM-DD[ HH:MM[:SS]]', into a
+    DataFrame with float columns year, month, day and seconds since the
+    start of the day. Parsing the fields directly, rather than converting to
+    datetimes, works for any model calendar and for years outside the range
+    of pandas timestamps. Unparseable values are NaN
+    """
+    fields = times.astype(str).str.extract(
+        r'^\s*(-?\d+)-(\d+)-(\d+)(?:[ T](\d+):(\d+)(?::(\d+(?:\.\d*)?))?)?').astype(float)
+    seconds = fields[3].fillna(0) * 3600 + fields[4].fillna(0) * 60 + fields[5].fillna(0)
+    return fields[[0, 1, 2]].set_axis(['year', 'month', 'day'], axis=1).assign(seconds=seconds)
+
+def _is_leap(year, calendar):
+    import numpy as np
+
+    if calendar == 'proleptic_gregorian':
+        return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return np.zeros(np.shape(year), dtype=bool)
+
+def _days_before_year(year, calendar):
+    import numpy as np
+
+    if calendar == 'proleptic_gregorian':
+        # Leap years from year 0, which is a leap year, up to year - 1
+        y = year - 1
+        return 365 * year + np.floor(y / 4) - np.floor(y / 100) + np.floor(y / 400) + 1
+    return year * sum(_month_lengths[calendar])
+
+def day_numbers(fields, calendar='proleptic_gregorian'):
+    """
+    Return an array of the days since 0000-01-01, including the fraction of
+    the day, of each row of a time_fields DataFrame in calendar, one of
+    'noleap', 'proleptic_gregorian' or '360_day'. Days which do not exist in
+    calendar, e.g. 30 February in a 'noleap' calendar, are counted as the
+    last day of the month
+    """
+    import numpy as np
+
+    year = fields.year.values
+    lengths = np.array(_month_lengths[calendar], dtype=float)
+    # Index of the month, with a placeholder for unparseable values, which
+    # stay NaN through year
+    month = np.nan_to_num(np.clip(fields.month.values, 1, 12), nan=1).astype(int) - 1
+
+    leap = _is_leap(year, calendar)
+    before = np.r_[0, np.cumsum(lengths)][month] + (leap & (month >= 2))
+    length = lengths[month] + (leap & (month == 1))
+    day = np.clip(fields.day.values, 1, length)
+
+    return _days_before_year(year, calendar) + before + day - 1 + fields.seconds.values / 86400
+
+def _on_unit_boundary(fields, units):
+    """
+    Return a boolean array, True where the time in a time_fields DataFrame is
+    the start of a month, where units is 'monthly', or of a year, where units
+    is 'yearly'. Always False for other units
+    """
+    start_of_month = (fields.day.values == 1) & (fields.seconds.values == 0)
+    return start_of_month & ((units == 'monthly') | ((units == 'yearly') & (fields.month.values == 1)))
+
+def decimal_years(fields):
+    """
+    Convert a time_fields DataFrame to decimal years in the proleptic
+    gregorian calendar, including the time of day
+    """
+    year = fields.year.values
+    days = day_numbers(fields) - _days_before_year(year, 'proleptic_gregorian')
+    return year + days / (365 + _is_leap(year, 'proleptic_gregorian'))
+
+class CoverageIndex:
+    """
+    Interval index of the time covered by each (experiment, variable,
+    frequency), built from the time_start/time_end of every file.
+
+    Overlapping and adjacent file intervals are merged into contiguous
+    segments. time_start and time_end may be the bounds of the first and last
+    intervals, so adjacent files abut, or the times of the first and last
+    samples, so adjacent files are one sampling period apart. Each series of
+    files is taken to have interval bounds if any two consecutive files abut,
+    or, for monthly and yearly data, if every file starts and ends on the
+    first of a month or year. Files with interval bounds are adjacent if the
+    space between them is no more than half a sampling period, otherwise no
+    more than one and a half, and any larger space is a gap. The same
+    tolerance is used when testing whether a segment covers a range of
+    years. The space is measured in days, including the time of day, in each
+    of the calendars in _month_lengths and the smallest is used, so adjacent
+    files are not split at month ends or leap days whichever calendar the
+    model uses.
+
+    Segments are stored as flat arrays of decimal years for each (variable,
+    frequency) so a coverage query is a single vectorised comparison across
+    all experiments.
+    """
+
+    def __init__(self, files):
+        """
+        files is a DataFrame with columns experiment, name, frequency,
+        time_start and time_end with one row per file and variable
+        """
+        import numpy as np
+
+        start_fields = time_fields(files.time_start)
+        end_fields = time_fields(files.time_end)
+        units = files.frequency.astype(str).str.split().str[-1].values
+        files = files[['experiment', 'name', 'frequency']].assign(
+            start=decimal_years(start_fields), end=decimal_years(end_fields),
+            aligned=(_on_unit_boundary(start_fields, units) &
+                     _on_unit_boundary(end_fields, units)))
+        for calendar in _month_lengths:
+            files['start_' + calendar] = day_numbers(start_fields, calendar)
+            files['end_' + calendar] = day_numbers(end_fields, calendar)
+        files = files.dropna(subset=['start', 'end'])
+        files = files.sort_values(['name', 'frequency', 'experiment', 'start', 'end'])
+
+        keys = ['name', 'frequency', 'experiment']
+        # First file of each (name, frequency, experiment)
+        first = np.zeros(len(files), dtype=bool)
+        first[:1] = True
+        for key in keys:
+            values = files[key].values
+            first[1:] |= values[1:] != values[:-1]
+
+        # Space in days between each file and the latest end of the files
+        # before it in the same experiment, the smallest in any calendar
+        space = np.full(len(files), np.inf)
+        groups = files.groupby(keys, sort=False)
+        for calendar in _month_lengths:
+            previous_end = np.r_[np.nan, groups['end_' + calendar].cummax().values[:-1]]
+            space = np.fmin(space, files['start_' + calendar].values - previous_end)
+
+        period = files.frequency.map({f: frequency_days(f) or 1. for f in files.frequency.unique()})
+        # Series with interval bounds, which have consecutive files that abut
+        # or are aligned to months or years throughout
+        abut = ~first & (np.abs(space) <= 0.5 * period.values)
+        groups = files.assign(abut=abut).groupby(keys, sort=False)
+        bounds = groups.abut.transform('any').values | groups.aligned.transform('all').values
+        files['factor'] = np.where(bounds, 0.5, 1.5)
+        new_segment = first | (space > files.factor.values * period.values)
+
+        segments = (files.assign(segment=np.cumsum(new_segment))
+                    .groupby('segment', sort=False)
+                    .agg(experiment=('experiment', 'first'), name=('name', 'first'),
+                         frequency=('frequency', 'first'), start=('start', 'min'),
+                         end=('end', 'max'), factor=('factor', 'first')))
+
+        # (experiment, name, frequency) -> list of [start, end] segments
+        self._segments = {}
+        # (name, frequency) -> (experiments, starts, ends, tolerances) with
+        # an array element for every segment
+        self._by_variable = {}
+        # (name, frequency) -> (experiments, starts, ends, tolerances) with
+        # an array element for the overall extent of each experiment
+        self._extents = {}
+
+        for (name, frequency), group in segments.groupby(['name', 'frequency'], sort=False):
+            # Coverage queries are in years
+            tolerance = group.factor.values * (frequency_period(frequency) or 1 / 365.25)
+
+            seg_expts = group.experiment.values.astype(object)
+            seg_starts = group.start.values
+            seg_ends = group.end.values
+            self._by_variable[(name, frequency)] = (seg_expts, seg_starts, seg_ends, tolerance)
+
+            # Segments of each experiment are consecutive, so reduce between
+            # the first segment of each experiment to find its overall extent
+            first = np.flatnonzero(np.r_[True, seg_expts[1:] != seg_expts[:-1]])
+            for expt, a, b in zip(seg_expts[first], first, np.r_[first[1:], len(seg_expts)]):
+                self._segments[(expt, name, frequency)] = [[s, e] for s, e in
+                                                           zip(seg_starts[a:b], seg_ends[a:b])]
+            self._extents[(name, frequency)] = (seg_expts[first],
+                                                np.minimum.reduceat(seg_starts, first),
+                                                np.maximum.reduceat(seg_ends, first),
+                                                tolerance[first])
+
+        self.frequencies = sorted(set(frequency for _, frequency in self._by_variable),
+                                  key=lambda f: (frequency_period(f) or 0, f))
+
+    def covering(self, variable, frequency, start_year, end_year, allow_gaps=False):
+        """
+        Return the set of experiments with variable at frequency covering
+        the years start_year to end_year inclusive. By default the coverage
+        must be contiguous, if allow_gaps is True only the overall extent is
+        considered
+        """
+        import numpy as np
+
+        if allow_gaps:
+            index = self._extents
+        else:
+            index = self._by_variable
+
+        if (variable, frequency) not in index:
+            return set()
+
+        expts, starts, ends, tolerance = index[(variable, frequency)]
+        mask = (starts <= start_year + tolerance) & (ends >= end_year + 1 - tolerance)
+        return set(np.unique(expts[mask]))
+
+    def segments(self, experiment, variable, frequency):
+        """
+        Return a list of (start, end) contiguous segments, in decimal years,
+        for variable at frequency in experiment
+        """
+        return [tuple(s) for s in self._segments.get((experiment, variable, frequency), [])]
+
+    def gaps(self, experiment, variable, frequency):
+        """
+        Return a list of (start, end) gaps, in decimal years, between the
+        contiguous segments for variable at frequency in experiment
+        """
+        segments = self._segments.get((experiment, variable, frequency), [])
+        return [(a[1], b[0]) for a, b in zip(segments[:-1], segments[1:])]
+
+class VariableOverlap:
+    """
+    Variables, at each frequency, shared between experiments.
+
+    Built from a table of the (variable, frequency) pairs in each experiment
+    as a sparse experiment x (variable, frequency) incidence matrix. The
+    experiment x experiment matrix of shared counts is a single sparse
+    matrix product, and the differences between a pair of experiments are
+    set operations on sorted index arrays, so both stay fast for hundreds of
+    experiments. scipy is used for the sparse product if it is installed,
+    otherwise a dense product is used.
+    """
+
+    def __init__(self, pairs):
+        """
+        pairs is a DataFrame with columns experiment, name and frequency
+        """
+        import numpy as np
+        import pandas as pd
+
+        pairs = pairs[['experiment', 'name', 'frequency']].drop_duplicates()
+
+        expt_codes, experiments = pd.factorize(pairs.experiment, sort=True)
+        var_codes, variables = pd.MultiIndex.from_frame(pairs[['name', 'frequency']]).factorize()
+        # factorize does not keep the level names
+        variables = variables.set_names(['name', 'frequency'])
+
+        self.experiments = list(experiments)
+        self.variables = variables
+        self._position = {name: i for i, name in enumerate(self.experiments)}
+
+        # Sorted column indices of the variables in each experiment
+        order = np.lexsort((var_codes, expt_codes))
+        expt_codes, var_codes = expt_codes[order], var_codes[order]
+        boundaries = np.searchsorted(expt_codes, np.arange(len(self.experiments) + 1))
+        self._columns = [var_codes[a:b] for a, b in zip(boundaries[:-1], boundaries[1:])]
+
+        shape = (len(self.experiments), len(self.variables))
+        try:
+            from scipy import sparse
+            incidence = sparse.csr_matrix((np.ones(len(expt_codes), dtype=np.float32),
+                                           (expt_codes, var_codes)), shape=shape)
+            counts = (incidence @ incidence.T).toarray()
+        except ImportError:
+            incidence = np.zeros(shape, dtype=np.float32)
+            incidence[expt_codes, var_codes] = 1
+            counts = incidence @ incidence.T
+
+        self._counts = np.rint(counts).astype(np.int64)
+
+    def __contains__(self, experiment):
+        """
+        True if experiment has any variables
+        """
+        return experiment in self._position
+
+    def _experiment_columns(self, experiment):
+        """
+        Return the sorted column indices of the variables in experiment,
+        empty for an experiment with no variables
+        """
+        import numpy as np
+
+        position = self._position.get(experiment)
+        if position is None:
+            return np.array([], dtype=np.int64)
+        return self._columns[position]
+
+    def matrix(self, experiments=None):
+        """
+        Return a DataFrame of the number of (variable, frequency) pairs each
+        pair of experiments has in common. The diagonal is the number in
+        each experiment. Optionally only for a subset of experiments.
+        Experiments with no variables have no pairs in common
+        """
+        import numpy as np
+        import pandas as pd
+
+        if experiments is None:
+            experiments = self.experiments
+        experiments = list(experiments)
+
+        known = [i for i, e in enumerate(experiments) if e in self._position]
+        index = [self._position[experiments[i]] for i in known]
+        counts = np.zeros((len(experiments), len(experiments)), dtype=self._counts.dtype)
+        counts[np.ix_(known, known)] = self._counts[np.ix_(index, index)]
+        return pd.DataFrame(counts, index=experiments, columns=experiments)
+
+    def difference(self, a, b):
+        """
+        Return a dict of DataFrames of the variables and frequencies common
+        to experiments a and b ('common'), only in a ('only_a') and only in b
+        ('only_b'). An experiment with no variables is treated as empty
+        """
+        import numpy as np
+
+        columns_a = self._experiment_columns(a)
+        columns_b = self._experiment_columns(b)
+
+        def frame(columns):
+            return self.variables[columns].to_frame(index=False)
+
+        return {
+            'common': frame(np.intersect1d(columns_a, columns_b, assume_unique=True)),
+            'only_a': frame(np.setdiff1d(columns_a, columns_b, assume_unique=True)),
+            'only_b': frame(np.setdiff1d(columns_b, columns_a, assume_unique=True)),
+        }
@@ -0,0 +1,90 @@
+"""
+Choose dask chunks for loading a variable that line up with the native
+chunk layout of its netCDF files.
+
+Dask chunks which cut across the native chunks make each compressed chunk
+be read and decompressed several times, and chunks much smaller than the
+native ones create very large numbers of tasks. Chunks chosen here are
+whole multiples of the native chunk shape, grown up to a target size.
+"""
+
+# Target size in bytes of each dask chunk
+default_target_size = 128 * 2**20
+
+def native_layout(path, variable):
+    """
+    Return a dict describing how variable is stored in the netCDF file at
+    path: dims, shape, chunks (None if stored contiguously), itemsize,
+    compression (zlib level, or 0 if uncompressed) and time_dim, the
+    unlimited dimension if there is one
+    """
+    import netCDF4
+
+    with netCDF4.Dataset(path) as ds:
+        var = ds.variables[variable]
+        chunking = var.chunking()
+        filters = var.filters() or {}
+
+        time_dim = None
+        for dim in var.dimensions:
+            if ds.dimensions[dim].isunlimited():
+                time_dim = dim
+                break
+
+        return {
+            'dims': tuple(var.dimensions),
+            'shape': tuple(var.shape),
+            'chunks': None if chunking == 'contiguous' else tuple(chunking),
+            'itemsize': var.dtype.itemsize,
+            'compression': filters.get('complevel', 0) if filters.get('zlib') else 0,
+            'time_dim': time_dim,
+        }
+
+def choose_chunks(layout, target_size=default_target_size):
+    """
+    Return a dict of dimension name to chunk size for a variable with the
+    given native layout, see native_layout.
+
+    Chunks start at the native chunk shape and are grown by whole multiples
+    of it, never beyond the size of the dimension in a single file. Spatial
+    dimensions are grown first, innermost first, as they are contiguous on
+    disk, then the time dimension, until a chunk reaches target_size bytes.
+    """
+    dims = layout['dims']
+    shape = layout['shape']
+
+    native = layout['chunks']
+    if native is None:
+        # Contiguous storage: any chunking is aligned, start from single
+        # records along the unlimited dimension
+        native = tuple(1 if dim == layout['time_dim'] else size
+                       for dim, size in zip(dims, shape))
+
+    chunks = [max(1, min(n, s)) for n, s in zip(native, shape)]
+
+    order = [i for i in reversed(range(len(dims))) if dims[i] != layout['time_dim']]
+    order += [i for i in range(len(dims)) if dims[i] == layout['time_dim']]
+
+    for i in order:
+        nbytes = layout['itemsize']
+        for c in chunks:
+            nbytes *= c
+        # Largest whole multiple of the native chunk which fits the target
+        factor = max(1, int(target_size // nbytes))
+        chunks[i] = min(shape[i], chunks[i] * factor)
+
+    return dict(zip(dims, chunks))
+
+def describe_layout(layout):
+    """
+    Return a short human readable description of a native layout
+    """
+    if layout['chunks'] is None:
+        storage = 'contiguous'
+    else:
+        storage = 'chunks {}'.format(dict(zip(layout['dims'], layout['chunks'])))
+    if layout['compression']:
+        compression = 'zlib level {}'.format(layout['compression'])
+    else:
+        compression = 'uncompressed'
+    return '{}, {}'.format(storage, compression)
@@ -0,0 +1,156 @@
+"""
+Start or attach to a dask cluster on which the explorers run loads and
+computations, so they use every core on the node in separate processes
+rather than the threaded scheduler inside the notebook kernel.
+"""
+
+# Tasks in these scheduler states have not finished
+active_states = ('waiting', 'queued', 'processing', 'no-worker')
+
+class ClusterManager:
+    """
+    Lazily started dask distributed client. If address is given attach to
+    that scheduler, otherwise start a local multi-process cluster with
+    n_workers workers, each with threads_per_worker threads and memory_limit
+    memory. Any other keyword arguments are passed to LocalCluster.
+
+    Loaded data stays lazy, and is computed on the cluster when it is used.
+    Set persist_threshold to a size in bytes to instead start computing
+    loaded data no larger than that as soon as it is loaded, holding the
+    result in worker memory
+    """
+
+    def __init__(self, address=None, n_workers=None, threads_per_worker=1,
+                 memory_limit='auto', persist_threshold=None, **kwargs):
+        self.address = address
+        self.n_workers = n_workers
+        self.threads_per_worker = threads_per_worker
+        self.memory_limit = memory_limit
+        self.persist_threshold = persist_threshold
+        self.kwargs = kwargs
+        self.cluster = None
+        self._client = None
+
+    @property
+    def client(self):
+        """
+        The dask distributed Client, started on first use. It is set as the
+        default scheduler, so computations on loaded data also run on the
+        cluster
+        """
+        if self._client is None:
+            self.start()
+        return self._client
+
+    def start(self):
+        from dask.distributed import Client, LocalCluster
+
+        if self._client is not None:
+            return self._client
+
+        if self.address is not None:
+            self._client = Client(self.address)
+        else:
+            self.cluster = LocalCluster(n_workers=self.n_workers,
+                                        threads_per_worker=self.threads_per_worker,
+                                        memory_limit=self.memory_limit,
+                                        processes=True,
+                                        **self.kwargs)
+            self._client = Client(self.cluster)
+        return self._client
+
+    @property
+    def running(self):
+        return self._client is not None
+
+    def persist(self, data):
+        """
+        Start computing data on the cluster and return immediately with a
+        version of data backed by the results held in worker memory
+        """
+        return self.client.persist(data)
+
+    def maybe_persist(self, data):
+        """
+        Persist data if it is no larger than persist_threshold bytes,
+        otherwise return it unchanged and lazy
+        """
+        if self.persist_threshold is None or data.nbytes > self.persist_threshold:
+            return data
+        return self.persist(data)
+
+    def status(self):
+        """
+        Return a list of dicts, one per worker, with the worker name, number
+        of threads, cpu load (%), memory use and limit (bytes), the number of
+        tasks assigned to the worker to run (processing) and the number of
+        results held in its memory (in_memory). The task counts are None if
+        they could not be read from the scheduler
+        """
+        if not self.running:
+            return []
+
+        # Worker heartbeat metrics are only updated periodically and their
+        # names change between versions of distributed, so read the counts
+        # from the scheduler's own state. Defined here so the function is
+        # sent to a remote scheduler by value
+        def worker_task_counts(dask_scheduler=None):
+            return {address: (len(ws.processing), len(ws.has_what))
+                    for address, ws in dask_scheduler.workers.items()}
+
+        try:
+            counts = self._client.run_on_scheduler(worker_task_counts)
+        except Exception:
+            counts = {}
+
+        workers = []
+        info = self._client.scheduler_info()
+        for address, worker in sorted(info.get('workers', {}).items()):
+            metrics = worker.get('metrics', {})
+            processing, in_memory = counts.get(address, (None, None))
+            workers.append({
+                'name': worker.get('name', address),
+                'nthreads': worker.get('nthreads', 0),
+                'cpu': metrics.get('cpu', 0),
+                'memory': metrics.get('memory', 0),
+                'memory_limit': worker.get('memory_limit', 0),
+                'processing': processing,
+                'in_memory': in_memory,
+            })
+        return workers
+
+    def task_states(self):
+        """
+        Return a dict of the number of tasks on the scheduler in each state,
+        e.g. 'queued', 'processing' and 'memory', or None if the cluster is
+        not running or the counts could not be read
+        """
+        if not self.running:
+            return None
+
+        def task_states(dask_scheduler=None):
+            from collections import Counter
+            return dict(Counter(ts.state for ts in dask_scheduler.tasks.values()))
+
+        try:
+            return self._client.run_on_scheduler(task_states)
+        except Exception:
+            return None
+
+    def close(self):
+        """
+        Close the client, and the cluster if it was started here
+        """
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        if self.cluster is not None:
+            self.cluster.close()
+            self.cluster = None
+
+    def __repr__(self):
+        if self.address is not None:
+            target = self.address
+        else:
+            target = 'local, n_workers={}'.format(self.n_workers)
+        return '{}({}, running={})'.format(type(self).__name__, target, self.running)
@@ -0,0 +1,295 @@
+"""
+Catalog and query logic for COSIMA Cookbook databases.
+
+This module does not depend on ipywidgets. The heavy dependencies
+(cosima_cookbook, pandas and sqlalchemy) are imported on first use rather
+than when the module is imported.
+"""
+from .catalog import CoverageIndex, ExperimentCatalog, VariableOverlap
+
+def return_value_or_empty(value):
+    """Return value if not None, otherwise empty"""
+    if value is None:
+        return ''
+    else:
+        return value
+
+def database_fingerprint(session):
+    """
+    Return a string identifying the state of the database behind session.
+    For a file database this includes its modification time and size, so the
+    fingerprint changes whenever the database is re-indexed
+    """
+    import os
+
+    url = session.get_bind().url
+    fingerprint = str(url)
+    if url.database is not None and os.path.exists(url.database):
+        stat = os.stat(url.database)
+        fingerprint += ':{}:{}'.format(stat.st_mtime_ns, stat.st_size)
+    return fingerprint
+
+def ncfile_query(session, experiment, variable, frequency=None):
+    """
+    Returns a query of the files containing variable in experiment,
+    optionally at a given frequency, ordered by time
+    """
+    from cosima_cookbook.database import CFVariable, NCFile, NCExperiment, NCVar
+
+    q = (session
+        .query(NCFile)
+        .join(NCFile.experiment)
+        .join(NCFile.ncvars)
+        .join(NCVar.variable)
+        .filter(NCExperiment.experiment == experiment)
+        .filter(CFVariable.name == variable)
+        .order_by(NCFile.time_start, NCFile.ncfile))
+
+    if frequency is not None:
+        q = q.filter(NCFile.frequency == frequency)
+
+    return q
+
+def ncfile_paths(session, experiment, variable, frequency=None, start_time=None, end_time=None):
+    """
+    Returns a list of the full paths of the files which contain variable in
+    experiment, ordered by time. Optionally only files at a given frequency,
+    and overlapping the time range start_time to end_time
+    """
+    from cosima_cookbook.database import NCFile
+
+    q = ncfile_query(session, experiment, variable, frequency)
+    if start_time is not None:
+        q = q.filter(NCFile.time_end >= start_time)
+    if end_time is not None:
+        q = q.filter(NCFile.time_start <= end_time)
+
+    return [str(ncfile.ncfile_path) for ncfile in q]
+
+class DatabaseExtension:
+
+    session = None
+    experiments = None
+    keywords = None
+    variables = None
+    expt_variable_map = None
+    catalog = None
+    _coverage = None
+    _overlap = None
+
+    def __init__(self, session=None, experiments=None):
+        import cosima_cookbook as cc
+
+        if session is None:
+            session = cc.database.create_session()
+        self.session = session
+
+        self.allexperiments = cc.querying.get_experiments(session, all=True)
+
+        if experiments is None:
+            self.experiments = self.allexperiments
+        else:
+            if isinstance(experiments, str):
+                experiments = [experiments,]
+            # Subset experiment column from dataframe, and don't pass as a simple list
+            # otherwise index is not correctly named
+            self.experiments = self.allexperiments[self.allexperiments.experiment.isin(experiments)]
+
+        self.keywords = sorted(cc.querying.get_keywords(session), key=str.casefold)
+        self.expt_variable_map = self.experiment_variable_map()
+        self.variables = self.unique_variable_list()
+        self.catalog = ExperimentCatalog(self.experiments, self.expt_variable_map)
+
+    def experiment_variable_map(self):
+        """
+        Make a pandas table with experiment as the index and columns
+        of name, long_name and restart flag.
+
+        Also make lists of unique name/long_name
+        """
+        import pandas as pd
+
+        allvars = pd.concat([self.get_variables(expt) for expt in self.experiments.experiment],
+                            keys=self.experiments.experiment)
+
+        # Create a new column to flag if variable is from a restart directory
+        allvars['restart'] = allvars.ncfile.str.contains('restart')
+
+        # Create a new column to characterise model type
+        allvars['model'] = None
+
+        # There is no metadata in the files or database that will let us know which
+        # model produced the output, so use a heuristic that assumes if the data
+        # resides in a directory that is named for a model type it is output from
+        # that model. Doesn't use os.path.sep as it is never envisaged this will be used
+        # outside of a posix system
+        allvars.loc[(allvars.ncfile.str.contains('/ocean/')  |
+                     allvars.ncfile.str.contains('/ocn/')), 'model'] = 'ocean'
+        allvars.loc[(allvars.ncfile.str.contains('/atmosphere/') |
+                     allvars.ncfile.str.contains('/atm/')), 'model'] = 'atmosphere'
+        allvars.loc[allvars.ncfile.str.contains('/ice/'), 'model'] = 'ice'
+
+        allvars['model'] = allvars['model'].astype('category')
+
+        # Create a new column to flag if variable has units which match a number of criteria
+        # that indicated it is a coordinate
+        allvars = allvars.assign(coordinate=(allvars.units.str.contains('degrees', na=False) |
+                                             allvars.units.str.contains('since', na=False)   |
+                                             allvars.units.str.match('^radians$', na=False)  |
+                                             allvars.units.str.startswith('days', na=False)))  # legit units: %/day, day of year
+
+        return allvars[['name', 'long_name', 'model', 'restart', 'coordinate']]
+
+    def unique_variable_list(self):
+        """
+        Extract a list of all variable name/long_name pairs from the experiment
+        keyword map
+        """
+        return self.expt_variable_map.reset_index(drop=True).drop_duplicates()
+
+    def keyword_filter(self, keywords):
+        """
+        Return a list of experiments matching *all* of the supplied keywords
+        """
+        import cosima_cookbook as cc
+
+        try:
+            return cc.querying.get_experiments(self.session, keywords=keywords).experiment
+        except AttributeError:
+            return []
+
+    def variable_filter(self, variables):
+        """
+        Return a set of experiments that contain all the defined variables
+        """
+        return set.intersection(*[self.catalog.with_variable(v) for v in variables])
+
+    @property
+    def coverage(self):
+        """
+        CoverageIndex of time intervals for every experiment, variable and
+        frequency. Built from a single query the first time it is used
+        """
+        if self._coverage is None:
+            self._coverage = CoverageIndex(self.get_file_intervals())
+        return self._coverage
+
+    @property
+    def overlap(self):
+        """
+        VariableOverlap of the variables and frequencies shared between
+        experiments. Built from a single query the first time it is used
+        """
+        if self._overlap is None:
+            self._overlap = VariableOverlap(self.get_experiment_variables())
+        return self._overlap
+
+    def coverage_filter(self, variable, frequency, start_year, end_year, allow_gaps=False):
+        """
+        Return a set of experiments which have variable at frequency covering
+        the years start_year to end_year inclusive, without gaps unless
+        allow_gaps is True
+        """
+        return self.coverage.covering(variable, frequency, start_year, end_year, allow_gaps)
+
+    def get_experiment(self, experiment):
+        """
+        Return a single row DataFrame of metadata for experiment
+        """
+        return self.catalog.get(experiment)
+
+    # Return more metadata than get_variables from cosima-cookbook
+    def get_variables(self, experiment, frequency=None):
+        """
+        Returns a DataFrame of variables for a given experiment and optionally
+        a given diagnostic frequency.
+        """
+        import pandas as pd
+        from sqlalchemy import func
+        from cosima_cookbook.database import CFVariable, NCFile, NCExperiment, NCVar
+
+        q = (self.session
+            .query(CFVariable.name,
+                    CFVariable.long_name,
+                    CFVariable.standard_name,
+                    CFVariable.units,
+                    NCFile.frequency,
+                    NCFile.ncfile,
+                    func.count(NCFile.ncfile).label('# ncfiles'),
+                    func.min(NCFile.time_start).label('time_start'),
+                    func.max(NCFile.time_end).label('time_end'))
+            .join(NCFile.experiment)
+            .join(NCFile.ncvars)
+            .join(NCVar.variable)
+            .filter(NCExperiment.experiment == experiment)
+            .order_by(NCFile.frequency,
+                    CFVariable.name,
+                    NCFile.time_start,
+                    NCFile.ncfile)
+            .group_by(CFVariable.name, NCFile.frequency))
+
+        if frequency is not None:
+            q = q.filter(NCFile.frequency == frequency)
+
+        return pd.DataFrame(q)
+
+    def get_file_intervals(self):
+        """
+        Returns a DataFrame with the experiment, variable name, frequency,
+        time_start and time_end of every file containing each variable, for
+        all experiments
+        """
+        import pandas as pd
+        from cosima_cookbook.database import CFVariable, NCFile, NCExperiment, NCVar
+
+        q = (self.session
+            .query(NCExperiment.experiment,
+                   CFVariable.name,
+                   NCFile.frequency,
+                   NCFile.time_start,
+                   NCFile.time_end)
+            .join(NCFile.experiment)
+            .join(NCFile.ncvars)
+            .join(NCVar.variable)
+            .filter(NCExperiment.experiment.in_(list(self.experiments.experiment))))
+
+        return pd.DataFrame(q, columns=['experiment', 'name', 'frequency', 'time_start', 'time_end'])
+
+    def get_experiment_variables(self):
+        """
+        Returns a DataFrame with the distinct experiment, variable name and
+        frequency combinations for all experiments
+        """
+        import pandas as pd
+        from cosima_cookbook.database import CFVariable, NCFile, NCExperiment, NCVar
+
+        q = (self.session
+            .query(NCExperiment.experiment,
+                   CFVariable.name,
+                   NCFile.frequency)
+            .join(NCFile.experiment)
+            .join(NCFile.ncvars)
+            .join(NCVar.variable)
+            .filter(NCExperiment.experiment.in_(list(self.experiments.experiment)))
+            .distinct())
+
+        return pd.DataFrame(q, columns=['experiment', 'name', 'frequency'])
+
+    def get_ncfile(self, experiment, variable, frequency=None):
+        """
+        Returns the full path of the first file, in time, which contains
+        variable in experiment, optionally at a given frequency. Returns
+        None if there is no such file
+        """
+        ncfile = ncfile_query(self.session, experiment, variable, frequency).first()
+        if ncfile is None:
+            return None
+        return str(ncfile.ncfile_path)
+
+    def get_ncfiles(self, experiment, variable, frequency=None, start_time=None, end_time=None):
+        """
+        Returns a list of the full paths of the files which contain variable
+        in experiment, ordered by time. Optionally only files at a given
+        frequency, and overlapping the time range start_time to end_time
+        """
+        return ncfile_paths(self.session, experiment, variable, frequency, start_time, end_time)
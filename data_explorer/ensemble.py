@@ -0,0 +1,223 @@
+"""
+Load the same variable from many experiments as a single ensemble.
+
+Each experiment is opened concurrently, the results are aligned onto a
+common time axis and stacked along a new experiment dimension. An
+experiment which fails to load, or cannot be aligned with the others, is
+reported rather than aborting the load.
+"""
+from .loading import cache_key, load_selection
+from .subset import time_dimension
+
+# Format of the period labels for each frequency unit, and the number of
+# the fields year, month, day and hour used
+_period_formats = {
+    'yearly': ('{:04d}', 1),
+    'monthly': ('{:04d}-{:02d}', 2),
+    'daily': ('{:04d}-{:02d}-{:02d}', 3),
+    'hourly': ('{:04d}-{:02d}-{:02d} {:02d}:00', 4),
+}
+
+def period_labels(times, frequency):
+    """
+    Return an array of string labels, e.g. '1990-01' for '1 monthly', of the
+    period at frequency which contains each of times, a DataArray of
+    datetime64 or cftime values. Runs with different calendars, or which
+    stamp samples at different times within each period, e.g. mid-month
+    and month end, have the same labels. Returns None if frequency is not
+    recognised
+    """
+    import numpy as np
+
+    try:
+        count, unit = str(frequency).split()
+        count = int(count)
+        label, nfields = _period_formats[unit]
+    except (ValueError, KeyError):
+        return None
+
+    fields = [times.dt.year.values, times.dt.month.values, times.dt.day.values,
+              times.dt.hour.values]
+    # Periods of several months or hours start at multiples of count
+    if unit == 'monthly':
+        fields[1] = (fields[1] - 1) // count * count + 1
+    elif unit == 'hourly':
+        fields[3] = fields[3] // count * count
+
+    return np.array([label.format(*values) for values in zip(*fields[:nfields])])
+
+def _relabel_time(data, time_dim, frequency):
+    """
+    Return data with its time_dim coordinate replaced by the period_labels
+    of its values at frequency
+    """
+    labels = period_labels(data[time_dim], frequency)
+    if labels is None:
+        return data
+    if len(set(labels)) != len(labels):
+        raise ValueError('Times are not unique at frequency {}'.format(frequency))
+    return data.assign_coords({time_dim: labels})
+
+def _grid(data, time_dim):
+    """
+    Return the dimensions of data other than time_dim, with their sizes and
+    coordinate values, as a hashable key
+    """
+    return tuple((dim, data.sizes[dim],
+                  tuple(data.indexes[dim].tolist()) if dim in data.indexes else None)
+                 for dim in data.dims if dim != time_dim)
+
+def _grid_mismatch(grid, reference):
+    """
+    Return a message describing how grid, see _grid, differs from reference
+    """
+    sizes = dict((dim, size) for dim, size, _ in grid)
+    reference_sizes = dict((dim, size) for dim, size, _ in reference)
+    if sizes != reference_sizes:
+        return 'Grid {} does not match {} of the other experiments'.format(sizes, reference_sizes)
+    dims = [dim for (dim, _, values), (_, _, ref_values) in zip(grid, reference)
+            if values != ref_values]
+    return 'Coordinates of {} do not match the other experiments'.format(', '.join(dims))
+
+def _load_member(engine, selection, cache, pool):
+    """
+    Load one ensemble member with its own database session, as sessions
+    cannot be shared between threads
+    """
+    from sqlalchemy.orm import Session
+
+    session = Session(bind=engine)
+    try:
+        return load_selection(session, selection, cache=cache, pool=pool)
+    finally:
+        session.close()
+
+def member_selection(experiment, variable, frequency, start_time, end_time, isel=None,
+                     chunks=None):
+    """
+    Return the selection, see data_explorer.loading, of one ensemble member
+    """
+    return {
+        'experiment': experiment,
+        'variable': variable,
+        'frequency': frequency,
+        'start_time': start_time,
+        'end_time': end_time,
+        'chunks': chunks,
+        'isel': isel,
+    }
+
+def release_members(cache, session, experiments, variable, frequency, start_time, end_time,
+                    isel=None, chunks=None, pool=None):
+    """
+    Release the staging cache entries of the ensemble members of experiments,
+    held since they were loaded by load_ensemble
+    """
+    if cache is None:
+        return
+    cache.release(cache_key(cache, session, member_selection(expt, variable, frequency,
+                                                             start_time, end_time, isel, chunks),
+                            pool)
+                  for expt in experiments)
+
+def load_ensemble(session, experiments, variable, frequency, start_time, end_time,
+                  isel=None, chunks=None, cache=None, pool=None, join='inner', max_workers=8):
+    """
+    Load variable at frequency between start_time and end_time from each of
+    experiments concurrently, using up to max_workers threads. isel, chunks,
+    cache and pool are as for data_explorer.loading.load_selection.
+
+    The time coordinate of each member is replaced by its period_labels at
+    frequency, so members with different calendars or sampling times share
+    a time axis, and members are aligned on it using join. With 'inner' only
+    periods present in every experiment are kept, and an experiment with no
+    periods in common with those before it is left out and reported as a
+    failure. With 'outer' all periods are kept and missing values filled
+    with NaN. If frequency is not recognised the original times are used.
+
+    All other dimensions must have the same sizes and coordinates in every
+    member. The grid shared by the most experiments is used, and experiments
+    on any other grid are left out and reported as failures.
+
+    Returns a tuple of the ensemble, a DataArray with a leading experiment
+    dimension or None if no experiment loaded, and a dict of experiment name
+    to error message for experiments which failed to load. If cache is given
+    the staged members of the ensemble are held in it, see release_members
+    """
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+    import pandas as pd
+    import xarray as xr
+
+    engine = session.get_bind()
+    selections = {expt: member_selection(expt, variable, frequency, start_time, end_time,
+                                         isel, chunks)
+                  for expt in experiments}
+
+    members = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {expt: executor.submit(_load_member, engine, selection, cache, pool)
+                   for expt, selection in selections.items()}
+        for expt, future in futures.items():
+            try:
+                members[expt] = future.result()
+            except Exception as e:
+                failures[expt] = '{}: {}'.format(type(e).__name__, e)
+
+    if len(members) == 0:
+        return None, failures
+
+    time_dims = set(time_dimension(a) for a in members.values()) - {None}
+    time_dim = time_dims.pop() if len(time_dims) == 1 else None
+
+    # Keep the members on the most common grid, the first if several are as
+    # common
+    grids = {expt: _grid(a, time_dim) for expt, a in members.items()}
+    reference = Counter(grids.values()).most_common(1)[0][0]
+    mismatched = [expt for expt, grid in grids.items() if grid != reference]
+    for expt in mismatched:
+        failures[expt] = 'ValueError: {}'.format(_grid_mismatch(grids[expt], reference))
+        del members[expt]
+    release_members(cache, session, mismatched, variable, frequency, start_time, end_time,
+                    isel, chunks, pool)
+
+    if time_dim is not None:
+        dropped = []
+        common = None
+        for expt in list(members):
+            try:
+                member = _relabel_time(members[expt], time_dim, frequency)
+                if join == 'inner':
+                    labels = set(member[time_dim].values)
+                    overlap = labels if common is None else common & labels
+                    if len(overlap) == 0:
+                        raise ValueError('No times in common with the other experiments')
+                    common = overlap
+                members[expt] = member
+            except Exception as e:
+                failures[expt] = '{}: {}'.format(type(e).__name__, e)
+                dropped.append(expt)
+                del members[expt]
+        release_members(cache, session, dropped, variable, frequency, start_time, end_time,
+                        isel, chunks, pool)
+        if len(members) == 0:
+            return None, failures
+
+    names = list(members)
+    arrays = [members[expt] for expt in names]
+
+    try:
+        if time_dim is not None:
+            # Only align time, the other dimensions already match
+            others = set(dim for a in arrays for dim in a.dims) - {time_dim}
+            arrays = xr.align(*arrays, join=join, exclude=others)
+
+        ensemble = xr.concat(arrays, dim=pd.Index(names, name='experiment'),
+                             coords='minimal', compat='override', join='exact')
+    except Exception:
+        release_members(cache, session, names, variable, frequency, start_time, end_time,
+                        isel, chunks, pool)
+        raise
+
+    return ensemble, failures
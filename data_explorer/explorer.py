@@ -0,0 +1,1555 @@
+"""
+Interactive ipywidgets explorers built on the catalog in
+:mod:`data_explorer.database`.
+
+cosima_cookbook and pandas are imported on first use so that importing the
+widgets is not slowed down by the cookbook's dependencies.
+"""
+import threading
+
+from ipywidgets import HTML, Button, VBox, HBox, Label, Select
+from ipywidgets import SelectMultiple, Tab, Text, Checkbox, Dropdown
+from ipywidgets import SelectionRangeSlider, Combobox, IntText, FloatRangeSlider
+
+from .catalog import VariableCatalog
+from .chunking import choose_chunks, describe_layout, native_layout
+from .cluster import active_states
+from .batch import database_spec, job_spec, save_job
+from .database import DatabaseExtension, return_value_or_empty
+from .ensemble import load_ensemble, release_members
+from .loading import cache_key, date_options, getvar_command, load_selection
+from .prefetch import candidate_selections
+from .subset import coordinate_axes, index_selection
+
+def close_layout(widget):
+    """
+    Close the layout and style of widget, which are widgets with their own
+    comms and are not closed with it
+    """
+    for name in ('layout', 'style'):
+        attribute = getattr(widget, name, None)
+        if attribute is not None:
+            attribute.close()
+
+def close_widget_tree(widget):
+    """
+    Close widget, its layout and style and every widget below it in the
+    children hierarchy, removing them from the kernel's widget registry.
+    Explorer widgets release their own state in their close methods
+    """
+    for child in getattr(widget, 'children', ()):
+        close_widget_tree(child)
+    widget.close()
+    close_layout(widget)
+
+class VariableSelector(VBox):
+    """
+    Combo widget based on a Select box with a search panel above to live
+    filter variables to Select. When a variable is selected the long name
+    attribute is displayed under the select box. There are also two 
+    checkboxes which hide coordinates and restart variables.
+
+    Note that a dict is used to populate the Select widget, so the visible
+    value is the variable name and is accessed via the label attribute, 
+    and the long name via the value attribute. 
+    """
+
+    variables = None
+    widgets = None
+
+    def __init__(self, variables, rows=10, **kwargs):
+        """
+        variables is a pandas dataframe. kwargs are passed through to child
+        widgets which, theoretically, allows for layout information to be
+        specified
+        """
+        self.widgets = {}
+        self._make_widgets(rows)
+        super().__init__(children=list(self.widgets.values()), **kwargs)
+        self.set_variables(variables)
+        self._set_info()
+        self._set_observes()
+
+    def _make_widgets(self, rows):
+
+        # Experiment selector element
+        self.widgets['model'] = Dropdown(
+            options=(),
+            layout={'padding': '0px 5px', 'width': 'initial'},
+            description='',
+        )
+        # Variable search
+        self.widgets['search'] = Text(
+            placeholder='Search: start typing', 
+            layout={'padding': '0px 5px', 'width': 'auto', 'overflow-x': 'scroll'},
+        )
+        # Variable selection box
+        self.widgets['selector'] = Select(
+            options=(), #sorted(self.variables.name, key=str.casefold),
+            rows=rows,
+            layout=self.widgets['search'].layout
+        )
+        # Variable info
+        self.widgets['info'] = HTML(
+            layout=self.widgets['search'].layout
+        )
+        # Variable filtering elements
+        self.widgets['filter_coords'] = Checkbox(
+            value=True,
+            indent=False,
+            description='Hide coordinates',
+        )
+        self.widgets['filter_restarts'] = Checkbox(
+            value=True,
+            indent=False,
+            description='Hide restarts',
+        )
+
+    def _set_observes(self):
+        """
+        Set event handlers
+        """
+        for w in ['filter_coords', 'filter_restarts']:
+            self.widgets[w].observe(self._filter_eventhandler, names='value')
+
+        self.widgets['model'].observe(self._model_eventhandler, names='value')
+        self.widgets['search'].observe(self._search_eventhandler, names='value')
+        self.widgets['selector'].observe(self._selector_eventhandler, names='value')
+
+    def close(self):
+        """
+        Remove event handlers, close child widgets and release variables
+        """
+        if self.widgets:
+            for widget in self.widgets.values():
+                widget.unobserve_all()
+                close_widget_tree(widget)
+            self.widgets.clear()
+        self.variables = None
+        super().close()
+        close_layout(self)
+
+    def set_variables(self, variables):
+        """
+        Change variables
+        """
+        # Add a new column to keep track of visibility in widget
+        self.variables = variables.assign(visible=True)
+
+        # Set default filtering
+        self._filter_variables()
+
+        # Update selector
+        self._update_selector(self.variables[self.variables.visible])
+
+    def _update_selector(self, variables):
+        """
+        Update the variables in the selector. The variable are passed as an
+        argument, so can differ from the internal variable list. This allows
+        for easy filtering
+        """
+        # Populate model selector. Note label and value differ
+        options = {'All models': ''}
+        for model in variables.model.cat.categories.values:
+            options["{} only".format(model.capitalize())] = model
+        self.widgets['model'].options = options
+
+        # Populate variable selector
+        self.widgets['selector'].options = dict(variables.sort_values(['name'])[['name','long_name']].values)
+
+    def _reset_filters(self):
+        """
+        Reset filters to default values
+        """
+        for w in ['filter_coords', 'filter_restarts']:
+            self.widgets[w].value = True
+
+    def _model_eventhandler(self, event=None):
+        """
+        Filter by model 
+        """
+        model = self.widgets['model'].value
+
+        # Reset the coord and restart filters when a model changed
+        self._reset_filters()
+        self._filter_variables(model=model)
+
+    def _filter_eventhandler(self, event=None):
+
+        self._filter_variables(self.widgets['filter_coords'].value,
+                               self.widgets['filter_restarts'].value,
+                               self.widgets['model'].value)
+
+    def _filter_variables(self, coords=True, restarts=True, model=''):
+        """
+        Optionally hide some variables
+        """
+        # Set up a mask with all true values
+        mask = self.variables.name.ne('')
+
+        # Filter for matching models
+        if model != '':
+            mask = mask & (self.variables['model'] == model)
+
+        # Conditionally filter out restarts and coordinates
+        if coords:
+            mask = mask & ~self.variables['coordinate']
+        if restarts:
+            mask = mask & ~self.variables['restart']
+
+        # Mask out hidden variables
+        self.variables['visible'] = mask
+
+        # Update the variable selector
+        self._update_selector(self.variables[self.variables.visible])
+
+        # Reset the search
+        self.widgets['search'].value = ''
+        self.widgets['selector'].value = None
+
+    def _search_eventhandler(self, event=None):
+        """
+        Live search bar, updates the selector options dynamically, does not alter
+        visible mask in variables
+        """
+        search_term = self.widgets['search'].value
+
+        variables = self.variables[self.variables.visible]
+        if search_term is not None or search_term != '':
+            try:
+                variables = variables[variables.name.str.contains(search_term, na=False) |
+                                    variables.long_name.str.contains(search_term, na=False) ]
+            except:
+                print('Illegal character in search!')
+                search_term = self.widgets['search'].value
+
+        self._update_selector(variables)
+    
+    def _selector_eventhandler(self, event=None):
+        """
+        Update variable info when variable selected
+        """
+        self._set_info(self.widgets['selector'].value)
+    
+    def _set_info(self, long_name=None):
+        """
+        Set long name info widget 
+        """
+        if long_name is None or long_name == '':
+            long_name = '&nbsp;'
+        style = '<style>p{word-wrap: break-word}</style>' 
+        self.widgets['info'].value = style + '<p>{long_name}</p>'.format(long_name=long_name)
+    
+    def delete(self, variable_names=None):
+        """
+        Remove variables
+        """
+        # If no variable specified just delete the currently selected one
+        if variable_names is None:
+            if self.widgets['selector'].label is None:
+                return None
+            else:
+                variable_names = [ self.widgets['selector'].label, ]
+
+        if isinstance(variable_names, str):
+            variable_names = [ variable_names, ]
+
+        mask = self.variables['name'].isin(variable_names)
+        deleted = self.variables[mask]
+
+        # Delete variables
+        self.variables = self.variables[~mask]
+
+        # Update selector. Use search eventhandler so the selector preserves any 
+        # current search term. It is annoying to have that reset and type in again 
+        # if multiple variables are to be added
+        self._search_eventhandler()
+
+        return deleted
+
+    def add(self, variables):
+        """
+        Add variables
+        """
+        import pandas as pd
+
+        # Concatenate existing and new variables
+        self.variables = pd.concat([self.variables, variables])
+
+        # Need to recalculate the visible flag as new variables have been added
+        self._filter_eventhandler(None)
+
+    def get_selected(self):
+        """
+        Return currently selected variable name
+        """
+        return self.widgets['selector'].label
+
+class VariableSelectorInfo(VariableSelector):
+    """
+    Subclass of VariableSelector to display more info in a separate widget
+    """
+
+    catalog = None
+
+    def __init__(self, variables, daterange, frequency, rows=10, **kwargs):
+
+        super(VariableSelectorInfo, self).__init__(variables, rows, **kwargs)
+
+        # Requires two widgets passed in as an argument. An html box where 
+        # extended meta-data will be displayed, and a date range widget for
+        # selecting start and end times to load
+        self.widgets['daterange'] = daterange
+        self.widgets['frequency'] = frequency
+
+        self._filter_eventhandler(None)
+
+        self.widgets['selector'].observe(self._var_eventhandler, names='value')
+        self.widgets['frequency'].observe(self._frequency_eventhandler, names='value')
+
+    def close(self):
+        """
+        Detach from the daterange and frequency widgets, which are owned by
+        the caller and so are not closed, then close as a VariableSelector
+        """
+        if self.widgets and 'frequency' in self.widgets:
+            self.widgets['frequency'].unobserve(self._frequency_eventhandler, names='value')
+            del self.widgets['daterange']
+            del self.widgets['frequency']
+        self.catalog = None
+        super().close()
+        close_layout(self)
+
+    def set_variables(self, variables):
+        """
+        Change variables, and index them by name and frequency
+        """
+        self.catalog = VariableCatalog(variables)
+        super().set_variables(variables)
+
+    def _var_eventhandler(self, selector):
+        """
+        Called when variable selected
+        """
+        variable_name = self.widgets['selector'].label
+        frequencies = self.catalog.frequencies(variable_name)
+
+        # Initialise daterange widget
+        self.widgets['daterange'].options = ['0000','0000']
+        self.widgets['daterange'].disabled = True
+
+        self.widgets['frequency'].options = []
+        self.widgets['frequency'].disabled = True
+
+        if len(frequencies) == 0:
+            return
+        
+        self.widgets['frequency'].options = frequencies
+        self.widgets['frequency'].index = 0
+        self.widgets['frequency'].disabled = False
+
+    def _frequency_eventhandler(self, selector):
+        variable_name = self.widgets['selector'].label
+        frequency = self.widgets['frequency'].value
+
+        variable = self.catalog.get(variable_name, frequency)
+
+        try:
+            # Populate daterange widget if variable contains necessary information
+            dates = date_options(variable['frequency'], variable['time_start'], variable['time_end'])
+            self.widgets['daterange'].options = [(i.strftime('%Y/%m/%d'), i) for i in dates]                
+            self.widgets['daterange'].value = (dates[0], dates[-1])
+        except:
+            pass
+        finally:
+            self.widgets['daterange'].disabled = False
+
+class VariableSelectFilter(HBox):
+    """
+    Combo widget which contains a VariableSelector from which variables can 
+    be transferred to another Select Widget to specify which variables should
+    be used to filter experiments
+    """
+
+    variables = None
+    widgets = None
+    subwidgets = None
+    buttons = None
+
+    def __init__(self, selvariables, **kwargs):
+        """
+        selvariables is a dataframe and is used to populate the VariableSelector
+
+        self.variables contains the variables transferred to the selected widget
+        """
+        import pandas as pd
+
+        self.variables = pd.DataFrame()
+        self.widgets = {}
+        self.subwidgets = {}
+        self.buttons = {}
+
+        layout = {'padding': '0px 5px'}
+
+        # Variable selector combo-widget
+        self.widgets['selector'] = VariableSelector(selvariables, **kwargs)
+
+        # Button to add variable from selector to selected
+        self.buttons['var_filter_add'] = Button(
+            tooltip='Add selected variable to filter',
+            icon='angle-double-right',
+            layout={'width': 'auto'},
+        )
+        # Button to add variable from selector to selected
+        self.buttons['var_filter_sub'] = Button(
+            tooltip='Remove selected variable from filter',
+            icon='angle-double-left',
+            layout={'width': 'auto'},
+        )
+        self.widgets['button_box'] = VBox(list(self.buttons.values()), 
+                                          layout={'padding': '100px 5px', 'height': '100%'})
+
+        # Selected variables for filtering with header widget
+        self.subwidgets['var_filter_label'] = HTML('Filter variables:', layout=layout)
+        self.subwidgets['var_filter_selected'] = Select(
+            options=[],
+            rows=10,
+            layout=layout,
+        )
+        self.widgets['filter_box'] = VBox(list(self.subwidgets.values()), layout=layout)
+
+        super().__init__(children=list(self.widgets.values()), **kwargs)
+
+        self._set_observes()
+
+    def _set_observes(self):
+        """
+        Set event handlers
+        """
+        self.buttons['var_filter_add'].on_click(self._add_var_to_selected)
+        self.buttons['var_filter_sub'].on_click(self._sub_var_from_selected)
+
+    def close(self):
+        """
+        Remove event handlers, close child widgets and release variables
+        """
+        if self.buttons:
+            self.buttons['var_filter_add'].on_click(self._add_var_to_selected, remove=True)
+            self.buttons['var_filter_sub'].on_click(self._sub_var_from_selected, remove=True)
+            for widget in self.widgets.values():
+                close_widget_tree(widget)
+            for d in (self.widgets, self.subwidgets, self.buttons):
+                d.clear()
+        self.variables = None
+        super().close()
+        close_layout(self)
+
+    def _update_variables(self):
+        """
+        Update filtered variables
+        """
+        self.subwidgets['var_filter_selected'].options = dict(self.variables.sort_values(['name'])[['name','long_name']].values)
+
+    def _add_var_to_selected(self, button):
+        """
+        Transfer variable from selector to filtered variables
+        """
+        self.add(self.widgets['selector'].delete())
+
+    def add(self, variable):
+        """
+        Add variable to filtered variables
+        """
+        import pandas as pd
+
+        if variable is None or len(variable) == 0:
+            return
+        self.variables = pd.concat([self.variables, variable])
+        self._update_variables()
+
+    def _sub_var_from_selected(self, button):
+        """
+        Transfer variable from filtered variables to selector
+        """
+        self.widgets['selector'].add(self.delete())
+
+    def delete(self, variable_names=None):
+        """
+        Delete variable from filtered variables
+        """
+        # If no variable specified just delete the currently selected one
+        if variable_names is None:
+            if self.subwidgets['var_filter_selected'].label is None:
+                return None
+            else:
+                variable_names = [self.subwidgets['var_filter_selected'].label]
+
+        if isinstance(variable_names, str):
+            variable_names = [ variable_names, ]
+
+        mask = self.variables['name'].isin(variable_names)
+        deleted = self.variables[mask]
+
+        # Delete variables
+        self.variables = self.variables[~mask]
+
+        # Update selector
+        self._update_variables()
+
+        return deleted
+
+    def selected_vars(self):
+        """
+        Return all the variables in the selected variables box
+        """
+        return self.subwidgets['var_filter_selected'].options
+
+class ClusterStatus(VBox):
+    """
+    Panel showing the cpu and memory load on each worker of a
+    data_explorer.cluster.ClusterManager and the progress of tasks. Call
+    watch to refresh it periodically, in a background thread, until the
+    cluster has been idle for a few intervals
+    """
+
+    cluster = None
+    widgets = None
+
+    def __init__(self, cluster, interval=1.0, **kwargs):
+        self.cluster = cluster
+        self.interval = interval
+        self.widgets = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.widgets['status'] = HTML()
+        self.widgets['refresh_button'] = Button(
+            description='Refresh',
+            layout={'width': 'auto'},
+            tooltip='Click to refresh cluster status',
+        )
+
+        super().__init__(children=list(self.widgets.values()), **kwargs)
+
+        self.widgets['refresh_button'].on_click(self._refresh_eventhandler)
+        self.refresh()
+
+    def _refresh_eventhandler(self, b):
+        self.refresh()
+
+    def refresh(self):
+        """
+        Update the status panel. Returns the number of tasks not yet
+        finished, or None if it could not be read from the scheduler
+        """
+        workers = self.cluster.status()
+        if len(workers) == 0:
+            self.widgets['status'].value = '<p>Cluster not started</p>'
+            return 0
+
+        def count(value):
+            return '?' if value is None else value
+
+        style = """
+        <style>
+            td, th { padding: 2px 10px; text-align: right; }
+        </style>
+        """
+        rows = []
+        for w in workers:
+            memory_limit = w['memory_limit'] or float('nan')
+            rows.append(('<tr><td>{name}</td><td>{cpu:.0f}%</td>'
+                         '<td>{memory:.2f} / {limit:.2f} GB</td>'
+                         '<td>{processing}</td><td>{in_memory}</td></tr>').format(
+                         name=w['name'], cpu=w['cpu'], memory=w['memory'] / 2**30,
+                         limit=memory_limit / 2**30, processing=count(w['processing']),
+                         in_memory=count(w['in_memory'])))
+
+        states = self.cluster.task_states()
+        if states is None:
+            active = done = None
+        else:
+            active = sum(states.get(state, 0) for state in active_states)
+            done = states.get('memory', 0)
+
+        self.widgets['status'].value = style + """
+        <p><b>Cluster:</b> {nworkers} workers, {nthreads} threads.
+        <b>Tasks:</b> {active} running or queued, {done} in memory</p>
+        <table>
+        <tr><th>Worker</th><th>CPU</th><th>Memory</th><th>Processing</th><th>In memory</th></tr>
+        {rows}
+        </table>
+        """.format(nworkers=len(workers),
+                   nthreads=sum(w['nthreads'] for w in workers),
+                   active=count(active),
+                   done=count(done),
+                   rows='\n'.join(rows))
+
+        return active
+
+    def watch(self, idle_intervals=3):
+        """
+        Refresh the panel every interval seconds in a background thread until
+        no tasks have been running for idle_intervals intervals
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(idle_intervals,), daemon=True)
+        self._thread.start()
+
+    def _watch(self, idle_intervals):
+        idle = 0
+        while not self._stop.wait(self.interval):
+            try:
+                active = self.refresh()
+            except Exception:
+                # Cluster has gone away
+                return
+            # If task counts cannot be read keep refreshing until closed
+            idle = idle + 1 if active == 0 else 0
+            if idle >= idle_intervals:
+                return
+
+    def close(self):
+        """
+        Stop refreshing and close child widgets. The cluster is not closed
+        """
+        self._stop.set()
+        if self.widgets:
+            self.widgets['refresh_button'].on_click(self._refresh_eventhandler, remove=True)
+            for widget in self.widgets.values():
+                close_widget_tree(widget)
+            self.widgets.clear()
+        self.cluster = None
+        super().close()
+        close_layout(self)
+
+class DatabaseExplorer(VBox):
+    """
+    Combo widget based on a select box containing all experiments in
+    specified database. 
+    """
+
+    session = None
+    de = None
+    ee = None
+    ensemble = None
+    ensemble_failures = None
+    widgets = None
+    cache = None
+    # Arguments of release_members for the loaded ensemble
+    _ensemble_members = None
+    cluster = None
+    prefetcher = None
+    pool = None
+
+    def __init__(self, session=None, de=None, cache=None, cluster=None, prefetcher=None,
+                 pool=None):
+        """
+        cache is an optional data_explorer.cache.StagingCache, cluster an
+        optional data_explorer.cluster.ClusterManager, prefetcher an optional
+        data_explorer.prefetch.Prefetcher and pool an optional
+        data_explorer.filepool.FilePool, all passed to ExperimentExplorer
+        """
+        if de is None: 
+            de = DatabaseExtension(session)
+        self.de = de
+        self.session = de.session
+        self.cache = cache
+        self.cluster = cluster
+        self.prefetcher = prefetcher
+        self.pool = pool
+        self.widgets = {}
+
+        self._make_widgets()
+        self._set_handlers()
+
+    @staticmethod
+    def return_value_or_empty(value):
+        """Return value if not None, otherwise empty"""
+        if value is None:
+            return ''
+        else:
+            return value
+
+    def _make_widgets(self):
+
+        style = '<style>p { line-height: 1.4; margin-bottom: 10px }</style>'
+
+        # Gui header
+        self.widgets['header'] = HTML(
+            value = style + """
+            <h3>Database Explorer</h3>
+
+            <p>Select an experiemt to show more detailed information where available.
+            With an experiment selected push 'Load Experiment' to open an Experiment 
+            Explorer gui.</p>
+
+            <p>The list of experiments can be filtered by keywords and/or variables. 
+            Multiple keywords can be selected using alt/option or the shift modifier
+            when selecting. To filter by variables select a variable and add it to the
+            "Filter variables" box using the ">>" button, and vice-versa to remove
+            variables from the filter. To filter by date coverage choose a variable,
+            frequency and range of years: only experiments with that variable
+            covering every year in the range are shown, unless gaps are allowed.
+            Push the 'Filter' button to show only matching experiments.</p>
+
+            <p>With a coverage variable, frequency and years chosen, push 'Load ensemble'
+            to load that variable from every experiment in the list, aligned in time
+            and stacked along an <tt>experiment</tt> dimension. The result is accessible
+            as the <tt>ensemble</tt> attribute of the DatabaseExplorer object.</p>
+
+            <p>To compare experiments select two or more in the 'Compare' tab and push
+            'Compare' to show how many variables, at each frequency, each pair has in
+            common. With exactly two selected the variables they do not share are
+            also listed.</p>
+
+            <p>The ExperimentExplorer element is accessible as the <tt>ee</tt> attribute
+            of the DatabaseExplorer object</p>
+            """,
+            description='',
+            layout={'width': '60%'},
+        ) 
+
+        # Experiment selector box
+        self.widgets['expt_selector'] = Select(
+            options=self.de.catalog.names,
+            rows=24,
+            layout={'padding': '0px 5px', 'width': 'auto'},
+            disabled=False
+        )
+
+        # Keyword filtering element is a Multiple selection box
+        # checkboxes
+        self.widgets['filter_widget'] = SelectMultiple(
+            rows=15,
+            options=sorted(self.de.keywords, key=str.casefold),
+            layout={'flex': '0 0 100%'},
+        )
+        # Reset keywords button
+        self.widgets['clear_keywords_button'] = Button(
+            description='Clear',
+            layout={'width': '20%', 'align': 'center'},
+            tooltip='Click to clear selected keywords'
+        )
+        self.widgets['keyword_box'] = VBox([self.widgets['filter_widget'], 
+                                            self.widgets['clear_keywords_button']],
+                                            layout={'flex': '0 0 40%'})
+
+        # Filtering button
+        self.widgets['filter_button'] = Button(
+            description='Filter',
+            # layout={'width': '50%', 'align': 'center'},
+            tooltip='Click to filter experiments',
+        )
+
+        # Variable filter selector combo widget
+        self.widgets['var_filter'] = VariableSelectFilter(self.de.variables, layout={'flex': '0 0 40%'})
+
+        # Date coverage filter elements. Frequencies are only populated when
+        # the tab is first shown, as that requires building the coverage index
+        self.widgets['coverage_variable'] = Combobox(
+            placeholder='Variable name',
+            options=sorted(self.de.variables.name.unique(), key=str.casefold),
+            description='Variable',
+        )
+        self.widgets['coverage_frequency'] = Dropdown(
+            options=(),
+            description='Frequency',
+        )
+        self.widgets['coverage_start'] = IntText(description='Start year', value=1900)
+        self.widgets['coverage_end'] = IntText(description='End year', value=1900)
+        self.widgets['coverage_gaps'] = Checkbox(
+            value=False,
+            indent=False,
+            description='Allow gaps',
+        )
+        self.widgets['ensemble_button'] = Button(
+            description='Load ensemble',
+            tooltip='Click to load the coverage variable from all listed experiments',
+        )
+        self.widgets['ensemble_info'] = HTML()
+        self.widgets['coverage_box'] = VBox([self.widgets['coverage_variable'],
+                                             self.widgets['coverage_frequency'],
+                                             self.widgets['coverage_start'],
+                                             self.widgets['coverage_end'],
+                                             self.widgets['coverage_gaps'],
+                                             self.widgets['ensemble_button'],
+                                             self.widgets['ensemble_info']],
+                                            layout={'padding': '10px 5px'})
+
+        # Experiment comparison elements
+        self.widgets['compare_selector'] = SelectMultiple(
+            rows=12,
+            options=self.de.catalog.names,
+            layout={'width': 'auto'},
+        )
+        self.widgets['compare_button'] = Button(
+            description='Compare',
+            tooltip='Click to compare the variables in the selected experiments',
+        )
+        self.widgets['compare_info'] = HTML(layout={'overflow': 'scroll'})
+        self.widgets['compare_box'] = VBox([self.widgets['compare_selector'],
+                                            self.widgets['compare_button'],
+                                            self.widgets['compare_info']],
+                                           layout={'padding': '10px 5px'})
+
+        # Tab box to contain keyword, variable and coverage filters, and
+        # experiment comparison
+        self.widgets['filter_tabs'] = Tab(title='Filter', children=[self.widgets['keyword_box'], 
+                                                                    self.widgets['var_filter'],
+                                                                    self.widgets['coverage_box'],
+                                                                    self.widgets['compare_box']])
+        self.widgets['filter_tabs'].set_title(0, 'Keyword')
+        self.widgets['filter_tabs'].set_title(1, 'Variable')
+        self.widgets['filter_tabs'].set_title(2, 'Coverage')
+        self.widgets['filter_tabs'].set_title(3, 'Compare')
+
+        self.widgets['load_button'] = Button(
+            description='Load Experiment',
+            disabled=False,
+            layout={'width': '50%', },
+            tooltip='Click to load experiment'
+        )
+
+        # Experiment information panel
+        self.widgets['expt_info'] = HTML(
+            value='',
+            description='',
+            layout={'width': '80%', 'align': 'center'},
+        )
+
+        # Experiment explorer box
+        self.widgets['expt_explorer'] = HBox()
+
+        # Some box layout nonsense to organise widgets in space
+        selectors = HBox([
+                        VBox([Label(value="Experiments:"), 
+                              self.widgets['expt_selector'],
+                              self.widgets['load_button'],
+                              ],
+                              layout={'padding': '0px 5px', 'flex': '0 0 30%'}),
+                        VBox([Label(value="Filter by:"), 
+                              self.widgets['filter_tabs'],
+                              self.widgets['filter_button']],
+                              layout={'padding': '0px 10px', 'flex': '0 0 65%'}),
+                        ])
+
+        # Call super init and pass widgets as children
+        super().__init__(children=[self.widgets['header'],
+                                   selectors,
+                                   self.widgets['expt_info'],
+                                   self.widgets['expt_explorer']])
+
+    def _set_handlers(self):
+        """
+        Define routines to handle button clicks and experiment selection
+        """
+        self.widgets['expt_selector'].observe(self._expt_eventhandler, names='value')
+        self.widgets['load_button'].on_click(self._load_experiment)
+        self.widgets['filter_button'].on_click(self._filter_experiments)
+        self.widgets['clear_keywords_button'].on_click(self._clear_keywords)
+        self.widgets['filter_tabs'].observe(self._tab_eventhandler, names='selected_index')
+        self.widgets['ensemble_button'].on_click(self._load_ensemble)
+        self.widgets['compare_button'].on_click(self._compare_experiments)
+
+    def close(self):
+        """
+        Remove event handlers, close all widgets, including any open
+        ExperimentExplorer, and release the database catalog
+        """
+        if self.widgets:
+            self.widgets['expt_selector'].unobserve(self._expt_eventhandler, names='value')
+            self.widgets['load_button'].on_click(self._load_experiment, remove=True)
+            self.widgets['filter_button'].on_click(self._filter_experiments, remove=True)
+            self.widgets['clear_keywords_button'].on_click(self._clear_keywords, remove=True)
+            self.widgets['filter_tabs'].unobserve(self._tab_eventhandler, names='selected_index')
+            self.widgets['ensemble_button'].on_click(self._load_ensemble, remove=True)
+            self.widgets['compare_button'].on_click(self._compare_experiments, remove=True)
+            if self.ee is not None:
+                self.ee.close()
+                self.ee = None
+            for child in self.children:
+                close_widget_tree(child)
+            self.widgets.clear()
+        self._release_ensemble()
+        self.ensemble_failures = None
+        self.de = None
+        self.session = None
+        self.cache = None
+        self.cluster = None
+        self.prefetcher = None
+        self.pool = None
+        super().close()
+        close_layout(self)
+
+    def _filter_restart_eventhandler(selector):
+        """
+        Re-populate variable list when checkboxes selected/de-selected
+        """
+        self._filter_variables()
+
+    def _clear_keywords(self, selector):
+        """
+        Deselect all keywords
+        """
+        self.widgets['filter_widget'].value = ()
+
+    def _tab_eventhandler(self, selector):
+        """
+        Populate the coverage frequencies when the coverage tab is first shown
+        """
+        if selector.new == 2:
+            self._set_coverage_frequencies()
+
+    def _set_coverage_frequencies(self):
+        """
+        Populate the coverage frequency selector from the coverage index
+        """
+        if len(self.widgets['coverage_frequency'].options) == 0:
+            self.widgets['coverage_frequency'].options = self.de.coverage.frequencies
+
+    def _expt_eventhandler(self, selector):
+        """
+        When experiment is selected populate the experiment information
+        elements
+        """
+        if selector.new is None:
+            return
+        self._show_experiment_information(selector.new)
+
+    def _show_experiment_information(self, experiment_name):
+        """
+        Populate box with experiment information
+        """
+        expt = self.de.catalog.record(experiment_name)
+
+        style ="""
+        <style>
+            body  { font: normal 8px Verdana, Arial, sans-serif; }
+            table { padding: 10px; border-spacing: 0px 0px; background-color: #fff;" }
+            td    { padding: 10px; }
+            p     { line-height: 1.2; margin-top: 5px }
+        </style>
+        """
+        self.widgets['expt_info'].value = style + """
+        <table>
+        <tr><td><b>Experiment:</b></td> <td>{experiment}</td></tr>
+        <tr><td style="vertical-align:top;"><b>Description:</b></td> <td><p>{description}</p></td></tr>
+        <tr><td><b>Notes:</b></td> <td>{notes}</td></tr>
+        <tr><td><b>Contact:</b></td> <td>{contact} &lt;{email}&gt;</td></tr>
+        <tr><td><b>No. files:</b></td> <td>{nfiles}</td></tr>
+        <tr><td><b>Created:</b></td> <td>{created}</td></tr>
+        </table>
+        """.format(
+                   experiment=experiment_name,
+                   description=return_value_or_empty(expt['description']),
+                   notes=return_value_or_empty(expt['notes']),
+                   contact=return_value_or_empty(expt['contact']),
+                   email=return_value_or_empty(expt['email']),
+                   nfiles=return_value_or_empty(expt['ncfiles']),
+                   created=return_value_or_empty(expt['created']),
+                   )
+        
+    def _filter_experiments(self, b):
+        """
+        Filter experiment list by keywords, variable and date coverage
+        """
+        options = set(self.de.experiments.experiment)
+
+        kwds = self.widgets['filter_widget'].value
+        if len(kwds) > 0:
+            options.intersection_update(self.de.keyword_filter(kwds))
+
+        variables = self.widgets['var_filter'].selected_vars()
+        if len(variables) > 0:
+            options.intersection_update(self.de.variable_filter(variables))
+
+        coverage_variable = self.widgets['coverage_variable'].value
+        if coverage_variable != '':
+            self._set_coverage_frequencies()
+            options.intersection_update(
+                self.de.coverage_filter(coverage_variable,
+                                        self.widgets['coverage_frequency'].value,
+                                        self.widgets['coverage_start'].value,
+                                        self.widgets['coverage_end'].value,
+                                        allow_gaps=self.widgets['coverage_gaps'].value)
+            )
+
+        self.widgets['expt_selector'].options = self.de.catalog.sort(options)
+
+    def _compare_experiments(self, b):
+        """
+        Show the shared variable counts of the selected experiments, and the
+        differences if exactly two are selected
+        """
+        info = self.widgets['compare_info']
+        experiments = list(self.widgets['compare_selector'].value)
+
+        if len(experiments) < 2:
+            info.value = '<p>Select two or more experiments to compare</p>'
+            return
+
+        overlap = self.de.overlap
+        info.value = ('<p>Number of variables, at each frequency, in common:</p>' +
+                      overlap.matrix(experiments).to_html())
+
+        empty = [e for e in experiments if e not in overlap]
+        if empty:
+            info.value += '<p><b>No variables indexed for:</b> {}</p>'.format(', '.join(empty))
+
+        if len(experiments) == 2:
+            a, b = experiments
+            difference = overlap.difference(a, b)
+            for key, title in (('only_a', 'Only in ' + a), ('only_b', 'Only in ' + b)):
+                info.value += '<p><b>{}:</b></p>'.format(title) + difference[key].to_html(index=False)
+
+    def _load_ensemble(self, b):
+        """
+        Load the coverage variable, frequency and years from every experiment
+        in the experiment selector which covers them
+        """
+        info = self.widgets['ensemble_info']
+
+        variable = self.widgets['coverage_variable'].value
+        if variable == '':
+            info.value = '<p>Choose a coverage variable to load</p>'
+            return
+        self._set_coverage_frequencies()
+        frequency = self.widgets['coverage_frequency'].value
+        start_year = self.widgets['coverage_start'].value
+        end_year = self.widgets['coverage_end'].value
+        start_time = '{:04d}-01-01'.format(start_year)
+        end_time = '{:04d}-12-31'.format(end_year)
+
+        # Only the listed experiments which have the variable for the years
+        covering = self.de.coverage_filter(variable, frequency, start_year, end_year,
+                                           allow_gaps=self.widgets['coverage_gaps'].value)
+        experiments = [e for e in self.widgets['expt_selector'].options if e in covering]
+        if len(experiments) == 0:
+            info.value = '<p>No listed experiments have {} at {} for {} to {}</p>'.format(
+                variable, frequency, start_year, end_year)
+            return
+
+        info.value = '<p>Loading {} at {} from {} experiments, please wait ...</p>'.format(
+            variable, frequency, len(experiments))
+
+        # Release any previous ensemble before loading the next
+        self._release_ensemble()
+        try:
+            if self.cluster is not None:
+                self.cluster.start()
+            self.ensemble, self.ensemble_failures = load_ensemble(self.session, experiments,
+                                                                  variable, frequency,
+                                                                  start_time, end_time,
+                                                                  cache=self.cache,
+                                                                  pool=self.pool)
+            if self.ensemble is not None:
+                self._ensemble_members = (list(self.ensemble.experiment.values), variable,
+                                          frequency, start_time, end_time)
+            if self.cluster is not None and self.ensemble is not None:
+                self.ensemble = self.cluster.maybe_persist(self.ensemble)
+        except Exception as e:
+            info.value = '<p>Error loading ensemble: {}</p>'.format(e)
+            return
+
+        failures = ''.join('<li>{}: {}</li>'.format(expt, error)
+                           for expt, error in sorted(self.ensemble_failures.items()))
+        if failures:
+            failures = '<p>Failed to load:</p><ul>{}</ul>'.format(failures)
+
+        if self.ensemble is None:
+            info.value = '<p>No experiments loaded</p>' + failures
+        else:
+            info.value = ('<p>Loaded {} experiments</p>'.format(self.ensemble.sizes['experiment']) +
+                          failures + self.ensemble._repr_html_())
+
+    def _release_ensemble(self):
+        """
+        Drop the loaded ensemble and release its entries in the staging cache
+        """
+        self.ensemble = None
+        if self._ensemble_members is not None:
+            release_members(self.cache, self.session, *self._ensemble_members, pool=self.pool)
+            self._ensemble_members = None
+
+    def _load_experiment(self, b):
+        """
+        Open an Experiment Explorer UI with selected experiment
+        """
+        if self.widgets['expt_selector'].value is not None:
+            # Release the previous explorer and any data it loaded
+            if self.ee is not None:
+                self.ee.close()
+            self.ee = ExperimentExplorer(session=self.session, 
+                                         experiment=self.widgets['expt_selector'].value,
+                                         cache=self.cache,
+                                         cluster=self.cluster,
+                                         prefetcher=self.prefetcher,
+                                         pool=self.pool)
+            self.widgets['expt_explorer'].children = [self.ee]
+
+
+class ExperimentExplorer(VBox):
+
+    session = None
+    data = None
+    experiment_name = None
+    variables = None
+    widgets = None
+    subset_widgets = None
+    cache = None
+    cluster = None
+    prefetcher = None
+    pool = None
+    # Staging cache keys of the loaded data
+    _held = ()
+
+    def __init__(self, session=None, experiment=None, cache=None, cluster=None, prefetcher=None,
+                 pool=None):
+        """
+        Pass a data_explorer.cache.StagingCache as cache to stage loaded data
+        in local storage, so later loads of the same selection are read from
+        the local copy.
+
+        Pass a data_explorer.cluster.ClusterManager as cluster to run loads,
+        and computations on loaded data, on a dask cluster. Loaded data is
+        only persisted in worker memory if it is no larger than the
+        persist_threshold of cluster. A panel showing worker load and task
+        progress is added below the Load button.
+
+        Pass a data_explorer.prefetch.Prefetcher as prefetcher to prefetch the
+        adjacent date windows and other frequencies of a variable after it is
+        loaded. Prefetching is cancelled when the selection changes.
+
+        Pass a data_explorer.filepool.FilePool as pool, e.g.
+        data_explorer.filepool.shared_pool(), to keep files open between
+        loads, so changing frequency or date range does not re-open them
+        """
+        import cosima_cookbook as cc
+
+        if experiment is None:
+            # Have to pass an experiment to DatabaseExtension so that
+            # it only creates a variable/keyword map for a single 
+            # experiment
+            expts = cc.querying.get_experiments(session, all=True)
+            experiment = expts.iloc[0].name
+
+        self.de = DatabaseExtension(session, experiments=experiment)
+
+        self.session = self.de.session
+        self.experiment_name = experiment
+        self.cache = cache
+        self.cluster = cluster
+        self.prefetcher = prefetcher
+        self.pool = pool
+        self.widgets = {}
+        # Native netCDF layouts and coordinate axes keyed by (experiment,
+        # variable, frequency)
+        self._layouts = {}
+        self._axes = {}
+
+        self._make_widgets()
+        self._load_experiment(self.experiment_name)
+        self._set_handlers()
+
+    @staticmethod
+    def return_value_or_empty(value):
+        """Return value if not None, otherwise empty"""
+        if value is None:
+            return ''
+        else:
+            return value
+
+    def _make_widgets(self):
+
+        # Header widget
+        self.widgets['header'] = HTML(
+            value="""
+            <h3>Experiment Explorer</h3>
+            
+            <p>Select a variable from the list to display metadata information.
+            Where appropriate select a date range. Pressing the <b>Load</b> button
+            will read the data into an <tt>xarray DataArray</tt> using the COSIMA Cookook. 
+            The command used is output and can be copied and modified as required.</p>
+
+            <p>The loaded DataArray is accessible as the <tt>data</tt> attribute 
+            of the ExperimentExplorer object. If a dask cluster is in use the data
+            is loaded into worker memory in the background, and the cluster panel
+            shows progress.</p> 
+            
+            <p>Where the variable has longitude, latitude or depth coordinates
+            the load can be restricted to a region and range of levels. Only the
+            selected region is read from disk.</p>
+
+            <p>Pushing <b>Save job</b> appends the current selection to a JSON file of
+            job specs, which can be run in parallel outside the notebook with
+            <tt>python -m data_explorer.batch jobs.json output_dir</tt>.</p>
+
+            <p>The selected experiment can be changed to any experiment present
+            in the current database session.</p>
+            """,
+            description='',
+        )
+        
+        # Experiment selector element
+        self.widgets['expt_selector'] = Dropdown(
+            options=sorted(self.de.allexperiments.experiment, key=str.casefold),
+            value=self.experiment_name,
+            description='',
+            layout={'width': '40%'}
+        )
+
+        # Date selection widget
+        self.widgets['frequency'] = Dropdown(
+            options=(),
+            description='Frequency',
+            disabled=True,
+        )
+
+        # Date selection widget
+        self.widgets['daterange'] = SelectionRangeSlider(
+            options=['0000','0001'],
+            index=(0,1),
+            description='Date range',
+            layout={'width': '80%'},
+            disabled=True
+        )
+
+        # Variable filter selector combo widget. Pass in two widgets so they
+        # can be updated by the VariableSelectorInfo widget
+        self.widgets['var_selector'] = VariableSelectorInfo(self.de.variables, 
+                                                            daterange=self.widgets['daterange'],
+                                                            frequency=self.widgets['frequency'],
+                                                            rows=20)
+
+        # DataArray information widget
+        self.widgets['data_box'] = HTML()
+
+        # Data load button
+        self.widgets['load_button'] = Button(
+            description='Load',
+            disabled=False,
+            layout={'width': '20%', 'align': 'center'},
+            tooltip='Click to load data'
+        )
+
+        # Spatial and vertical subsetting widgets, keyed by axis. Ranges are
+        # set from the coordinates of the selected variable. Vertical levels
+        # are usually unevenly spaced, so depth is chosen from the levels
+        # themselves rather than an evenly stepped range
+        self.subset_widgets = {}
+        for axis, description in (('X', 'Longitude'), ('Y', 'Latitude')):
+            self.subset_widgets[axis] = FloatRangeSlider(
+                min=0, max=1, value=(0, 1),
+                description=description,
+                layout={'width': '80%'},
+                disabled=True,
+            )
+        self.subset_widgets['Z'] = SelectionRangeSlider(
+            options=[('0', 0.)],
+            index=(0, 0),
+            description='Depth',
+            layout={'width': '80%'},
+            disabled=True,
+        )
+        for axis, slider in self.subset_widgets.items():
+            self.widgets['subset_' + axis] = slider
+
+        info_pane = VBox([self.widgets['frequency'],
+                          self.widgets['daterange']] +
+                          list(self.subset_widgets.values()),
+                          layout={'padding': '10% 0', 'width': '50%'})
+
+        centre_pane = HBox([VBox([self.widgets['var_selector']]),
+                                  info_pane])
+
+        # Batch job export widgets
+        self.widgets['job_file'] = Text(
+            value='jobs.json',
+            description='Job file',
+        )
+        self.widgets['save_job_button'] = Button(
+            description='Save job',
+            tooltip='Click to save the current selection as a batch job',
+        )
+
+        children = [self.widgets['header'],
+                    self.widgets['expt_selector'],
+                    centre_pane,
+                    HBox([self.widgets['load_button'],
+                          self.widgets['save_job_button'],
+                          self.widgets['job_file']])]
+
+        # Dask cluster status panel
+        if self.cluster is not None:
+            self.widgets['cluster_status'] = ClusterStatus(self.cluster)
+            children.append(self.widgets['cluster_status'])
+
+        children.append(self.widgets['data_box'])
+
+        # Call super init and pass widgets as children
+        super().__init__(children=children)
+
+    def _set_handlers(self):
+        """
+        Define routines to handle button clicks and experiment selection
+        """
+
+        self.widgets['load_button'].on_click(self._load_data)
+        self.widgets['save_job_button'].on_click(self._save_job)
+        self.widgets['expt_selector'].observe(self._expt_eventhandler, names='value')
+        self.widgets['frequency'].observe(self._subset_eventhandler, names='value')
+        for w in ['expt_selector', 'frequency', 'daterange']:
+            self.widgets[w].observe(self._cancel_prefetch, names='value')
+        self.widgets['var_selector'].widgets['selector'].observe(self._cancel_prefetch, names='value')
+
+    def close(self):
+        """
+        Remove event handlers, close all widgets and release the database
+        catalog, variables and any loaded data
+        """
+        if self.widgets:
+            self.widgets['load_button'].on_click(self._load_data, remove=True)
+            self.widgets['save_job_button'].on_click(self._save_job, remove=True)
+            self.widgets['expt_selector'].unobserve(self._expt_eventhandler, names='value')
+            self.widgets['frequency'].unobserve(self._subset_eventhandler, names='value')
+            for w in ['expt_selector', 'frequency', 'daterange']:
+                self.widgets[w].unobserve(self._cancel_prefetch, names='value')
+            self._cancel_prefetch()
+            for child in self.children:
+                close_widget_tree(child)
+            self.widgets.clear()
+        self._release_data()
+        self.variables = None
+        self.de = None
+        self.session = None
+        self.cache = None
+        self.cluster = None
+        self.prefetcher = None
+        self.pool = None
+        self._layouts = None
+        self._axes = None
+        self.subset_widgets = None
+        super().close()
+        close_layout(self)
+
+    def _expt_eventhandler(self, selector):
+        """
+        Called when experiment dropdown menu changes
+        """
+        self._load_experiment(selector.new)
+
+    def _cancel_prefetch(self, selector=None):
+        """
+        Called when the selection changes, stop prefetching
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.cancel()
+
+    def _subset_eventhandler(self, selector):
+        """
+        Called when frequency changes. Set the subsetting ranges from the
+        coordinates of the selected variable
+        """
+        axes = self._coordinate_axes(self.widgets['var_selector'].get_selected(),
+                                     self.widgets['frequency'].value)
+
+        for axis, slider in self.subset_widgets.items():
+            if axis not in axes:
+                slider.disabled = True
+                continue
+            dim, values = axes[axis]
+            slider.description = dim
+            if axis == 'Z':
+                # Snap to the levels, in increasing order
+                levels = sorted(float(v) for v in values)
+                slider.options = [('{:.6g}'.format(v), v) for v in levels]
+                slider.index = (0, len(levels) - 1)
+                slider.disabled = False
+                continue
+            lower, upper = float(values.min()), float(values.max())
+            # Step by the mean grid spacing
+            slider.step = (upper - lower) / max(len(values) - 1, 1)
+            # Set limits in an order which is always valid
+            slider.max = max(slider.max, upper)
+            slider.min = lower
+            slider.max = upper
+            slider.value = (lower, upper)
+            slider.disabled = False
+
+    def _load_data(self, b):
+        """
+        Called when load_button clicked
+        """
+        data_box = self.widgets['data_box']
+
+        selection = self._selection()
+
+        load_command = """
+        <pre><code>{}</code></pre>
+        """.format(getvar_command(selection))
+
+        layout = self._native_layout(selection['variable'], selection['frequency'])
+        if layout is not None:
+            load_command += '<p>Chunks chosen to match native file layout: {}</p>'.format(describe_layout(layout))
+
+        # Interim message to tell user what is happening
+        data_box.value = 'Loading data, using following command ...\n\n' + load_command + 'Please wait ... '
+        if self.cache is not None:
+            data_box.value = data_box.value + '(staging in local cache {}) '.format(self.cache.directory)
+
+        # Release the previous data, so its staged copy can be evicted
+        self._release_data()
+        try:
+            if self.cluster is not None:
+                # Start the client before building the graph, so it is the
+                # default scheduler for the load and any staging
+                self.cluster.start()
+            self.data = load_selection(self.session, selection, cache=self.cache, pool=self.pool)
+            if self.cache is not None:
+                self._held = [cache_key(self.cache, self.session, selection, self.pool)]
+            if self.cluster is not None:
+                self.data = self.cluster.maybe_persist(self.data)
+                self.widgets['cluster_status'].watch()
+        except Exception as e:
+            data_box.value = data_box.value + 'Error loading variable {} data: {}'.format(selection['variable'], e)
+            return
+
+        if self.prefetcher is not None:
+            self.prefetcher.start(self.de, self._prefetch_candidates(selection))
+
+        # Update data box with message about command used and pretty HTML
+        # representation of DataArray
+        data_box.value = 'Loaded data with' + load_command + self.data._repr_html_()
+
+    def _prefetch_candidates(self, selection):
+        """
+        Return the selections the user is likely to make next, built from
+        the options of the date range slider at each frequency
+        """
+        catalog = self.widgets['var_selector'].catalog
+        dates = [value for _, value in self.widgets['daterange'].options]
+
+        other_dates = {}
+        for frequency in catalog.frequencies(selection['variable']):
+            variable = catalog.get(selection['variable'], frequency)
+            try:
+                other_dates[frequency] = date_options(frequency, variable['time_start'],
+                                                      variable['time_end'])
+            except Exception:
+                continue
+
+        return candidate_selections(selection, dates, other_dates)
+
+    def _release_data(self):
+        """
+        Drop the loaded data and release its entry in the staging cache
+        """
+        self.data = None
+        if self.cache is not None and self._held:
+            self.cache.release(self._held)
+        self._held = ()
+
+    def _save_job(self, b):
+        """
+        Called when save_job_button clicked. Append the current selection to
+        the job file
+        """
+        path = self.widgets['job_file'].value
+        daterange = self.widgets['daterange']
+        if self.widgets['var_selector'].get_selected() is None:
+            self.widgets['data_box'].value = 'Select a variable before saving a job'
+            return
+        # The placeholder options shown before dates are known are strings
+        if daterange.disabled or any(isinstance(t, str) for t in daterange.value):
+            self.widgets['data_box'].value = 'Select a frequency and date range before saving a job'
+            return
+        try:
+            spec = job_spec(self._selection(), **database_spec(self.session))
+            save_job(path, spec)
+        except Exception as e:
+            self.widgets['data_box'].value = 'Error saving job to {}: {}'.format(path, e)
+            return
+        self.widgets['data_box'].value = 'Saved job <tt>{}</tt> to {}'.format(spec['name'], path)
+
+    def _selection(self):
+        """
+        Return the current selection as a dict, as used by data_explorer.loading
+        """
+        (start_time, end_time) = self.widgets['daterange'].value
+        variable = self.widgets['var_selector'].get_selected()
+        frequency = self.widgets['frequency'].value
+
+        layout = self._native_layout(variable, frequency)
+
+        ranges = {axis: slider.value for axis, slider in self.subset_widgets.items()
+                  if not slider.disabled}
+        isel = index_selection(self._coordinate_axes(variable, frequency), ranges)
+
+        return {
+            'experiment': self.experiment_name,
+            'variable': variable,
+            'frequency': frequency,
+            'start_time': str(start_time),
+            'end_time': str(end_time),
+            'chunks': None if layout is None else choose_chunks(layout),
+            'isel': isel,
+        }
+
+    def _coordinate_axes(self, variable, frequency):
+        """
+        Return the longitude, latitude and depth coordinates of variable at
+        frequency, read from a representative file, see
+        data_explorer.subset.coordinate_axes. Empty if they could not be read
+        """
+        key = (self.experiment_name, variable, frequency)
+        if key not in self._axes:
+            try:
+                path = self.de.get_ncfile(self.experiment_name, variable, frequency)
+                self._axes[key] = coordinate_axes(path, variable)
+            except Exception:
+                self._axes[key] = {}
+        return self._axes[key]
+
+    def _native_layout(self, variable, frequency):
+        """
+        Return the native chunk layout and compression of variable at
+        frequency, read from a representative file, or None if it could not
+        be read
+        """
+        key = (self.experiment_name, variable, frequency)
+        if key not in self._layouts:
+            try:
+                path = self.de.get_ncfile(self.experiment_name, variable, frequency)
+                self._layouts[key] = native_layout(path, variable)
+            except Exception:
+                self._layouts[key] = None
+        return self._layouts[key]
+
+    def _load_experiment(self, experiment_name):
+        """
+        When first instantiated, or experiment changed, the variable
+        selector widget needs to be refreshed
+        """
+        import pandas as pd
+
+        self.de = DatabaseExtension(self.session, experiments=experiment_name)
+        self.experiment_name = experiment_name
+        # Add metadata
+        self.variables = pd.merge(self.de.variables, 
+                                  self.de.get_variables(self.experiment_name), 
+                                  how='inner', on=['name', 'long_name'])
+        self._load_variables()
+
+    def _load_variables(self):
+        """
+        Populate the variable selector dialog
+        """
+        self.widgets['var_selector'].set_variables(self.variables)
+        self.widgets['var_selector']._filter_eventhandler(None)
+
+def VariableExplorer(ds):
+
+    ds.hvplot.quadmesh(datashade=True)
@@ -0,0 +1,112 @@
+"""
+Pool of open netCDF files shared by all loads in a kernel.
+
+Opening a netCDF file costs filesystem metadata operations and parsing of
+its header, which on a parallel filesystem can dominate small loads.
+Switching frequency or date range re-opens the same files. FilePool keeps
+the opened, decoded Datasets in a bounded least recently used pool so
+repeated or overlapping loads skip the open and parse.
+"""
+from collections import OrderedDict
+import threading
+
+from .subset import time_dimension
+
+class FilePool:
+    """
+    Least recently used pool of at most maxsize open Datasets, keyed by file
+    path and chunks. Evicted Datasets are closed. Data loaded from an evicted
+    Dataset is still valid, as xarray re-opens the file if it is read again
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._datasets = OrderedDict()
+        # Pools are shared between threads, e.g. by the prefetcher and
+        # ensemble loads
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._datasets)
+
+    @staticmethod
+    def _key(path, chunks):
+        return (path, None if chunks is None else tuple(sorted(chunks.items())))
+
+    def open(self, path, chunks=None):
+        """
+        Return the Dataset for the netCDF file at path, opened with chunks,
+        from the pool if possible
+        """
+        import xarray as xr
+
+        key = self._key(path, chunks)
+        with self._lock:
+            if key in self._datasets:
+                self.hits += 1
+                self._datasets.move_to_end(key)
+                return self._datasets[key]
+
+        # Open outside the lock so slow opens do not block other threads
+        ds = xr.open_dataset(path, chunks={} if chunks is None else chunks)
+
+        with self._lock:
+            if key in self._datasets:
+                # Opened concurrently by another thread
+                ds.close()
+                self._datasets.move_to_end(key)
+                return self._datasets[key]
+            self.misses += 1
+            self._datasets[key] = ds
+            while len(self._datasets) > self.maxsize:
+                _, evicted = self._datasets.popitem(last=False)
+                evicted.close()
+        return ds
+
+    def open_variable(self, paths, variable, chunks=None):
+        """
+        Return variable from the netCDF files at paths, concatenated along
+        their time dimension
+        """
+        import xarray as xr
+
+        arrays = [self.open(path, chunks)[variable] for path in paths]
+        if len(arrays) == 0:
+            raise ValueError('No files found for variable {}'.format(variable))
+        if len(arrays) == 1:
+            return arrays[0]
+
+        time_dim = time_dimension(arrays[0])
+        if time_dim is None:
+            # Not time varying, all files hold the same data
+            return arrays[0]
+
+        return xr.concat(arrays, dim=time_dim, coords='minimal',
+                         compat='override', join='override')
+
+    def clear(self):
+        """
+        Close all pooled Datasets
+        """
+        with self._lock:
+            while self._datasets:
+                _, ds = self._datasets.popitem()
+                ds.close()
+
+    def __repr__(self):
+        return '{}(maxsize={}, open={}, hits={}, misses={})'.format(
+            type(self).__name__, self.maxsize, len(self), self.hits, self.misses)
+
+_shared_pool = None
+
+def shared_pool(maxsize=256):
+    """
+    Return the FilePool shared by all loads in this kernel, creating it with
+    maxsize if it does not exist
+    """
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = FilePool(maxsize)
+    return _shared_pool
@@ -0,0 +1,114 @@
+"""
+Load data for a selection made in the explorers, without any widgets.
+
+A selection is a dict with the keys experiment, variable, frequency,
+start_time and end_time, which are passed to cosima_cookbook.querying.getvar,
+and optionally chunks, a dict of dimension name to dask chunk size, and
+isel, a dict of dimension name to [start, stop] index range to subset the
+data before it is read.
+"""
+import re
+
+from .database import database_fingerprint, ncfile_paths
+from .subset import apply_index_selection, isel_command, time_dimension
+
+def cache_key(cache, session, selection, pool=None):
+    """
+    Return the key of selection, loaded with pool as for load_selection, in
+    a StagingCache
+    """
+    # Chunking does not change the data, and staged data is rechunked
+    # anyway, so it is not part of the key
+    key = {k: v for k, v in selection.items() if k != 'chunks'}
+    if pool is not None:
+        # Files opened through a pool are not decoded exactly as getvar
+        # decodes them, e.g. times may be datetime64 rather than cftime, so
+        # they are staged separately
+        key['opened_with'] = 'pool'
+    return cache.key(key, database_fingerprint(session))
+
+def date_options(frequency, time_start, time_end):
+    """
+    Return the times offered by the date range slider for a variable at
+    frequency, e.g. '1 monthly', with data from time_start to time_end
+    """
+    import pandas as pd
+
+    # Convert human readable frequency to pandas compatible frequency string
+    freq = re.sub(r'^(\d+) (\w)(\w+)', r'\1\2', str(frequency).upper())
+    return pd.date_range(time_start, time_end, freq=freq)
+
+def load_selection(session, selection, cache=None, pool=None):
+    """
+    Return a DataArray for selection. If a StagingCache is passed the data
+    is read from the cache when it has been staged before. Otherwise it is
+    read, see open_selection, and written to the cache, and the staged copy
+    returned. The cache entry is held until released with
+    cache.release([cache_key(cache, session, selection, pool)])
+    """
+    if cache is not None:
+        key = cache_key(cache, session, selection, pool)
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+    data = open_selection(session, selection, pool=pool)
+
+    if cache is not None:
+        data = cache.put(key, data)
+
+    return data
+
+def open_selection(session, selection, pool=None):
+    """
+    Return a lazily loaded DataArray for selection, read from the netCDF
+    files with getvar. If a data_explorer.filepool.FilePool is passed the
+    files are opened through it instead, so files already opened by earlier
+    loads are not opened and parsed again. Pooled files are decoded with
+    xarray's defaults, so the result can differ from getvar's, e.g. in the
+    type of the times
+    """
+    if pool is not None:
+        return apply_index_selection(_open_pooled(session, selection, pool), selection.get('isel'))
+
+    import cosima_cookbook as cc
+
+    kwargs = {}
+    if selection.get('chunks'):
+        kwargs['chunks'] = selection['chunks']
+
+    data = cc.querying.getvar(selection['experiment'],
+                              selection['variable'],
+                              session,
+                              start_time=selection['start_time'],
+                              end_time=selection['end_time'],
+                              frequency=selection['frequency'],
+                              **kwargs)
+    return apply_index_selection(data, selection.get('isel'))
+
+def _open_pooled(session, selection, pool):
+    """
+    Open the files of selection through pool and select its time range, as
+    getvar does
+    """
+    paths = ncfile_paths(session, selection['experiment'], selection['variable'],
+                         selection['frequency'], selection['start_time'], selection['end_time'])
+    data = pool.open_variable(paths, selection['variable'], selection.get('chunks'))
+
+    time_dim = time_dimension(data)
+    if time_dim is not None:
+        data = data.sel({time_dim: slice(selection['start_time'], selection['end_time'])})
+    return data
+
+def getvar_command(selection):
+    """
+    Return the cosima_cookbook command which loads selection, so users can
+    copy and modify it
+    """
+    command = ("cc.querying.getvar('{experiment}', '{variable}', session,\n"
+               "                    start_time='{start_time}', end_time='{end_time}', "
+               "frequency='{frequency}'").format(**selection)
+    if selection.get('chunks'):
+        command += ",\n                    chunks={!r}".format(selection['chunks'])
+    return command + ')' + isel_command(selection.get('isel'))
+
@@ -0,0 +1,170 @@
+"""
+Speculative prefetch of the selections a user is likely to load next.
+
+While a user looks at one selection, a background thread reads the files
+of likely next selections, such as the adjacent date window or the other
+frequencies of the same variable, so the operating system page cache is
+warm when they are loaded. If a StagingCache is used the selections are
+staged into it instead. A byte budget bounds the I/O of each run, and a run
+is cancelled as soon as the user makes a different selection.
+"""
+import threading
+
+from .loading import cache_key, open_selection
+
+def adjacent_windows(selection, dates, count=1):
+    """
+    Return selections for up to count date windows, each spanning the same
+    number of dates as the window of selection, after and before it, nearest
+    first and the later window before the earlier. dates are the times
+    offered by the date range slider, see data_explorer.loading.date_options,
+    so the windows are ones the user can select
+    """
+    import pandas as pd
+
+    dates = pd.DatetimeIndex(dates)
+    try:
+        start, end = dates.get_indexer([pd.Timestamp(selection['start_time']),
+                                        pd.Timestamp(selection['end_time'])])
+    except (ValueError, TypeError, OverflowError):
+        return []
+    if start < 0 or end < start:
+        return []
+
+    # The next window starts where this one ends, as when dragging the slider
+    shift = max(end - start, 1)
+    windows = []
+    for k in range(1, count + 1):
+        for (s, e) in ((start + k * shift, end + k * shift), (start - k * shift, end - k * shift)):
+            if 0 <= s and e < len(dates):
+                windows.append(dict(selection, start_time=str(dates[s]), end_time=str(dates[e])))
+    return windows
+
+def candidate_selections(selection, dates, other_dates=None, count=1):
+    """
+    Return a list of likely next selections, most likely first: the count
+    adjacent date windows at the same frequency, see adjacent_windows, then
+    the default selection of each of the other frequencies. other_dates is a
+    dict of frequency to the dates offered by the slider at that frequency.
+    Changing frequency selects all of its dates and resets any spatial
+    subset, so the candidates match the selection, and staging cache key,
+    the user will make
+    """
+    candidates = adjacent_windows(selection, dates, count)
+    for frequency, frequency_dates in (other_dates or {}).items():
+        if frequency == selection['frequency'] or len(frequency_dates) == 0:
+            continue
+        # Chunks are chosen for a specific frequency, so use the default
+        candidates.append(dict(selection, frequency=frequency,
+                               start_time=str(frequency_dates[0]),
+                               end_time=str(frequency_dates[-1]),
+                               chunks=None, isel={}))
+    return candidates
+
+class Prefetcher:
+    """
+    Background prefetcher. budget is the maximum number of bytes read, or
+    staged, in each run. If cache is a StagingCache selections are staged
+    into it, opening files through pool if given, otherwise their files are
+    read in blocks of block_size bytes to warm the page cache
+    """
+
+    def __init__(self, budget=2 * 2**30, cache=None, block_size=16 * 2**20, pool=None):
+        self.budget = budget
+        self.cache = cache
+        self.pool = pool
+        self.block_size = block_size
+        self.fetched = 0
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self):
+        """
+        Stop the current run. Reading stops at the next block, staging at
+        the next selection
+        """
+        self._cancel.set()
+
+    def start(self, de, selections):
+        """
+        Cancel any current run and start prefetching selections, in order,
+        until the budget is used. de is the DatabaseExtension used to find
+        the files of each selection
+        """
+        self.cancel()
+
+        # Each run has its own event, so a cancelled run which has not yet
+        # stopped cannot be restarted by accident
+        cancel = threading.Event()
+        self._cancel = cancel
+        self.fetched = 0
+
+        if self.cache is None:
+            # Database sessions are not thread safe, so find files here
+            files = []
+            for s in selections:
+                for path in de.get_ncfiles(s['experiment'], s['variable'], s['frequency'],
+                                           s['start_time'], s['end_time']):
+                    if path not in files:
+                        files.append(path)
+            target, args = self._warm_files, (files, cancel)
+        else:
+            target, args = self._stage, (de.session.get_bind(), selections, cancel)
+
+        self._thread = threading.Thread(target=target, args=args, daemon=True)
+        self._thread.start()
+
+    def _warm_files(self, files, cancel):
+        """
+        Read files in blocks, discarding the data, until the budget is used
+        or the run is cancelled
+        """
+        buffer = bytearray(self.block_size)
+        for path in files:
+            try:
+                with open(path, 'rb', buffering=0) as f:
+                    while not cancel.is_set() and self.fetched < self.budget:
+                        n = f.readinto(buffer)
+                        if not n:
+                            break
+                        self.fetched += n
+            except OSError:
+                continue
+            if cancel.is_set() or self.fetched >= self.budget:
+                return
+
+    def _stage(self, engine, selections, cancel):
+        """
+        Stage selections into the cache until the budget is used or the run
+        is cancelled. Selections larger than the remaining budget are skipped
+        """
+        from sqlalchemy.orm import Session
+
+        session = Session(bind=engine)
+        try:
+            for selection in selections:
+                if cancel.is_set():
+                    return
+                try:
+                    key = cache_key(self.cache, session, selection, self.pool)
+                    if key in self.cache:
+                        continue
+                    data = open_selection(session, selection, pool=self.pool)
+                    if self.fetched + data.nbytes > self.budget or cancel.is_set():
+                        continue
+                    # Nothing reads the staged copy yet, so do not hold it
+                    self.cache.put(key, data, hold=False)
+                    self.fetched += data.nbytes
+                except Exception:
+                    # Prefetching is speculative, a failure is not an error
+                    continue
+        finally:
+            session.close()
+
+    def __repr__(self):
+        return '{}(budget={}, running={}, fetched={})'.format(type(self).__name__, self.budget,
+                                                             self.running, self.fetched)
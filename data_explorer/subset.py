@@ -0,0 +1,111 @@
+"""
+Spatial and vertical subsetting of a variable at load time.
+
+The 1D coordinates of a variable are read from a representative file and
+used to convert longitude, latitude and depth ranges to index ranges. The
+index selections are applied to the lazily opened data, so only the region
+is read from disk.
+"""
+
+# Units which identify each axis when a coordinate has no axis attribute
+_axis_units = {
+    'X': ('degrees_east', 'degree_east', 'degrees_e', 'degree_e'),
+    'Y': ('degrees_north', 'degree_north', 'degrees_n', 'degree_n'),
+}
+
+def coordinate_axis(coord):
+    """
+    Return 'X', 'Y' or 'Z' if the coordinate DataArray is a longitude,
+    latitude or vertical coordinate, otherwise None
+    """
+    axis = str(coord.attrs.get('axis', '')).upper()
+    if axis in ('X', 'Y', 'Z'):
+        return axis
+
+    units = str(coord.attrs.get('units', '')).lower()
+    for axis, names in _axis_units.items():
+        if units in names:
+            return axis
+
+    if 'positive' in coord.attrs:
+        return 'Z'
+
+    return None
+
+def time_dimension(data):
+    """
+    Return the name of the time dimension of data, the first dimension
+    named time or starting with time, e.g. time_0, or None if it has none
+    """
+    for dim in data.dims:
+        if dim.startswith('time'):
+            return dim
+    return None
+
+def coordinate_axes(path, variable):
+    """
+    Return a dict of axis ('X', 'Y' or 'Z') to (dimension name, numpy array
+    of coordinate values) for the 1D dimension coordinates of variable in
+    the netCDF file at path
+    """
+    import xarray as xr
+
+    axes = {}
+    with xr.open_dataset(path, decode_times=False) as ds:
+        for dim in ds[variable].dims:
+            if dim not in ds.coords or ds[dim].ndim != 1:
+                continue
+            axis = coordinate_axis(ds[dim])
+            if axis is not None and axis not in axes:
+                axes[axis] = (dim, ds[dim].values)
+    return axes
+
+def index_range(values, lower, upper):
+    """
+    Return (start, stop) indices of the values of a monotonic coordinate
+    which lie between lower and upper inclusive
+    """
+    import numpy as np
+
+    values = np.asarray(values)
+    if len(values) > 1 and values[0] > values[-1]:
+        # Decreasing coordinate: find indices in the reversed array
+        start, stop = index_range(values[::-1], lower, upper)
+        return len(values) - stop, len(values) - start
+
+    start = int(np.searchsorted(values, lower, side='left'))
+    stop = int(np.searchsorted(values, upper, side='right'))
+    return start, stop
+
+def index_selection(axes, ranges):
+    """
+    Return a dict of dimension name to [start, stop] index range for each
+    axis in ranges, a dict of axis to (lower, upper) coordinate range. Axes
+    whose range covers the whole coordinate are left out
+    """
+    isel = {}
+    for axis, (lower, upper) in ranges.items():
+        if axis not in axes:
+            continue
+        dim, values = axes[axis]
+        start, stop = index_range(values, lower, upper)
+        if (start, stop) != (0, len(values)):
+            isel[dim] = [start, stop]
+    return isel
+
+def apply_index_selection(data, isel):
+    """
+    Apply an index selection, as returned by index_selection, to data
+    """
+    if not isel:
+        return data
+    return data.isel({dim: slice(start, stop) for dim, (start, stop) in isel.items()})
+
+def isel_command(isel):
+    """
+    Return the python source for applying isel to a DataArray
+    """
+    if not isel:
+        return ''
+    return '.isel({})'.format(', '.join('{}=slice({}, {})'.format(dim, start, stop)
+                                        for dim, (start, stop) in isel.items()))
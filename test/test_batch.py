@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from data_explorer.batch import check_outputs, job_spec, job_tasks, load_jobs, save_job
+
+def selection(start_time='1990-01-01 00:00:00', isel=None):
+    return {
+        'experiment': 'expt',
+        'variable': 'temp',
+        'frequency': '1 monthly',
+        'start_time': start_time,
+        'end_time': '1991-12-31 00:00:00',
+        'chunks': {'time': 1},
+        'isel': isel,
+    }
+
+def test_default_names_differ_by_selection():
+    a = job_spec(selection())
+    b = job_spec(selection(isel={'st_ocean': [0, 10]}))
+    c = job_spec(selection(start_time='1990-06-01 00:00:00'))
+    assert a['name'].startswith('expt_temp_1_monthly_')
+    assert len({a['name'], b['name'], c['name']}) == 3
+    assert job_spec(selection())['name'] == a['name']
+
+def test_save_job(tmp_path):
+    path = str(tmp_path / 'jobs.json')
+    save_job(path, job_spec(selection()))
+    save_job(path, job_spec(selection(isel={'st_ocean': [0, 10]})))
+    # Saving the same selection again replaces it
+    save_job(path, job_spec(selection()))
+    assert len(load_jobs(path)) == 2
+
+    with pytest.raises(ValueError):
+        save_job(path, job_spec(selection(start_time='1990-06-01 00:00:00'),
+                                name=load_jobs(path)[0]['name']))
+
+def test_year_tasks(tmp_path):
+    tasks = job_tasks(job_spec(selection(), database='db.db'), str(tmp_path))
+    assert [t['selection']['start_time'][:10] for t in tasks] == ['1990-01-01', '1991-01-01']
+    assert all(t['database'] == 'db.db' for t in tasks)
+
+def test_check_outputs(tmp_path):
+    spec = job_spec(selection(), name='job')
+    check_outputs(spec, str(tmp_path))
+    with open(tmp_path / 'job' / 'job.json') as f:
+        assert json.load(f) == spec
+
+    # Same outputs from a different database is fine
+    check_outputs(dict(spec, database='other.db'), str(tmp_path))
+    with pytest.raises(ValueError):
+        check_outputs(job_spec(selection(isel={'st_ocean': [0, 10]}), name='job'), str(tmp_path))
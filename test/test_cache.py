@@ -0,0 +1,74 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from data_explorer.cache import StagingCache
+
+def sample(value, n=1000):
+    # Random values, which do not compress, with mean close to value
+    data = value + np.random.default_rng(0).uniform(-0.5, 0.5, n) / 100
+    return xr.DataArray(data, dims=['time'], name='temp')
+
+@pytest.fixture
+def cache(tmp_path):
+    # Room for about one entry
+    return StagingCache(str(tmp_path), max_size=12000)
+
+def test_put_get(cache):
+    data = cache.put('a', sample(1))
+    assert 'a' in cache
+    assert round(float(data.mean())) == 1
+    assert round(float(cache.get('a').mean())) == 1
+    assert cache.get('missing') is None
+
+def test_held_entries_not_evicted(cache):
+    a = cache.put('a', sample(1))
+    b = cache.put('b', sample(2))
+    # Both are held, so neither is evicted although the cache is too large
+    assert 'a' in cache and 'b' in cache
+    assert float(xr.concat([a, b], dim='member').mean()) == pytest.approx(1.5, abs=0.01)
+
+    cache.release(['a'])
+    cache.put('c', sample(3), hold=False)
+    assert 'a' not in cache
+    assert 'b' in cache and 'c' in cache
+
+def test_release_counts(cache):
+    cache.put('a', sample(1))
+    cache.get('a')
+    cache.release(['a'])
+    assert cache.held() == {'a'}
+    cache.release(['a'])
+    assert cache.held() == set()
+    # Releasing a key which is not held is harmless
+    cache.release(['a', 'missing'])
+
+def test_concurrent_put_same_key(cache):
+    results = []
+
+    def put():
+        results.append(cache.put('a', sample(1)))
+
+    threads = [threading.Thread(target=put) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(round(float(r.mean())) == 1 for r in results)
+    assert cache.temporaries() == []
+
+def test_stale_temporaries_removed(cache):
+    stale = os.path.join(cache.directory, 'a.zarr.crashed.tmp')
+    os.makedirs(stale)
+    with open(os.path.join(stale, 'chunk'), 'wb') as f:
+        f.write(b'0' * 1000)
+    assert cache.size() >= 1000
+
+    os.utime(os.path.join(stale, 'chunk'), (0, 0))
+    os.utime(stale, (0, 0))
+    cache.evict()
+    assert not os.path.exists(stale)
@@ -0,0 +1,198 @@
+import pandas as pd
+import pytest
+
+from data_explorer.catalog import (CoverageIndex, ExperimentCatalog, VariableCatalog,
+                                   VariableOverlap, day_numbers, time_fields)
+
+def files_frame(rows):
+    return pd.DataFrame(rows, columns=['experiment', 'name', 'frequency', 'time_start', 'time_end'])
+
+def monthly_files(experiment, name, frequency, year, last_days, times=('00:00:00', '00:00:00')):
+    """
+    One file per month of year, with the last day of each month in last_days
+    """
+    return [(experiment, name, frequency,
+             '{:04d}-{:02d}-01 {}'.format(year, month, times[0]),
+             '{:04d}-{:02d}-{:02d} {}'.format(year, month, last, times[1]))
+            for month, last in zip(range(1, 13), last_days)]
+
+noleap_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+def test_day_numbers():
+    fields = time_fields(pd.Series(['1900-02-28 12:00:00', '1900-03-01 00:00:00',
+                                    '2000-02-28 00:00:00', '2000-03-01 00:00:00']))
+    days = day_numbers(fields, 'proleptic_gregorian')
+    # 1900 is not a leap year, 2000 is
+    assert days[1] - days[0] == pytest.approx(0.5)
+    assert days[3] - days[2] == pytest.approx(2)
+
+    fields = time_fields(pd.Series(['0001-02-30', '0001-03-01']))
+    days = day_numbers(fields, '360_day')
+    assert days[1] - days[0] == pytest.approx(1)
+
+def test_time_fields_unparseable():
+    fields = time_fields(pd.Series(['not a date', None]))
+    assert fields.year.isna().all()
+
+def test_daily_monthly_files_contiguous():
+    index = CoverageIndex(files_frame(monthly_files('a', 'temp', '1 daily', 1990, noleap_days) +
+                                      monthly_files('a', 'temp', '1 daily', 1991, noleap_days)))
+    assert len(index.segments('a', 'temp', '1 daily')) == 1
+    assert index.gaps('a', 'temp', '1 daily') == []
+    assert index.covering('temp', '1 daily', 1990, 1991) == {'a'}
+
+def test_noleap_across_leap_year():
+    # A noleap model has no 29 February in 1992
+    index = CoverageIndex(files_frame(monthly_files('a', 'temp', '1 daily', 1992, noleap_days)))
+    assert index.gaps('a', 'temp', '1 daily') == []
+
+def test_360_day_calendar():
+    index = CoverageIndex(files_frame(monthly_files('a', 'temp', '1 daily', 1, [30] * 12)))
+    assert index.gaps('a', 'temp', '1 daily') == []
+
+def test_sub_daily_files_contiguous():
+    rows = monthly_files('a', 'u', '3 hourly', 1990, noleap_days, times=('00:00:00', '21:00:00'))
+    index = CoverageIndex(files_frame(rows))
+    assert index.gaps('a', 'u', '3 hourly') == []
+
+def test_sub_daily_gap():
+    rows = [('a', 'u', '3 hourly', '1990-01-01 00:00:00', '1990-01-01 09:00:00'),
+            ('a', 'u', '3 hourly', '1990-01-01 18:00:00', '1990-01-01 21:00:00')]
+    index = CoverageIndex(files_frame(rows))
+    assert len(index.gaps('a', 'u', '3 hourly')) == 1
+
+def test_overlapping_files_merged():
+    rows = [('a', 'temp', '1 monthly', '1990-01-16', '1995-12-16'),
+            ('a', 'temp', '1 monthly', '1992-01-16', '1993-12-16'),
+            ('a', 'temp', '1 monthly', '1996-01-16', '1999-12-16')]
+    index = CoverageIndex(files_frame(rows))
+    assert len(index.segments('a', 'temp', '1 monthly')) == 1
+    assert index.covering('temp', '1 monthly', 1990, 1999) == {'a'}
+
+def test_gap_excludes_experiment():
+    rows = [('a', 'temp', '1 monthly', '1990-01-16', '1994-12-16'),
+            ('a', 'temp', '1 monthly', '1996-01-16', '1999-12-16'),
+            ('b', 'temp', '1 monthly', '1990-01-16', '1999-12-16')]
+    index = CoverageIndex(files_frame(rows))
+
+    assert len(index.gaps('a', 'temp', '1 monthly')) == 1
+    assert index.covering('temp', '1 monthly', 1990, 1999) == {'b'}
+    assert index.covering('temp', '1 monthly', 1990, 1999, allow_gaps=True) == {'a', 'b'}
+    assert index.covering('temp', '1 monthly', 1990, 1994) == {'a', 'b'}
+    assert index.covering('temp', '1 monthly', 1985, 1999, allow_gaps=True) == set()
+
+def test_interval_bounds_missing_year():
+    # Files abut, with time_end the end of the last interval, so 1990 is missing
+    rows = [('a', 'temp', '1 yearly', '1980-01-01', '1990-01-01'),
+            ('a', 'temp', '1 yearly', '1991-01-01', '2000-01-01')]
+    index = CoverageIndex(files_frame(rows))
+    assert index.gaps('a', 'temp', '1 yearly') == [(1990, 1991)]
+    assert index.covering('temp', '1 yearly', 1980, 1989) == {'a'}
+    assert index.covering('temp', '1 yearly', 1980, 1999) == set()
+
+    rows = [('a', 'temp', '1 yearly', '{}-01-01'.format(year), '{}-01-01'.format(year + 5))
+            for year in (1980, 1985, 1991)]
+    index = CoverageIndex(files_frame(rows))
+    assert len(index.gaps('a', 'temp', '1 yearly')) == 1
+
+def test_interval_bounds_covering():
+    rows = [('a', 'temp', '1 yearly', '1980-01-01', '2010-01-01')]
+    index = CoverageIndex(files_frame(rows))
+    assert index.covering('temp', '1 yearly', 1980, 2009) == {'a'}
+    assert index.covering('temp', '1 yearly', 1979, 2009) == set()
+    assert index.covering('temp', '1 yearly', 1980, 2010) == set()
+
+    rows = [('a', 'temp', '1 monthly', '2001-01-01', '2010-12-01')]
+    index = CoverageIndex(files_frame(rows))
+    assert index.covering('temp', '1 monthly', 2001, 2009) == {'a'}
+    assert index.covering('temp', '1 monthly', 2001, 2010) == set()
+
+def test_interval_bounds_missing_month():
+    months = ['1990-{:02d}-01'.format(month) for month in range(1, 13)] + ['1991-01-01']
+    rows = [('a', 'temp', '1 monthly', start, end) for start, end in zip(months[:-1], months[1:])
+            if not start.startswith('1990-06')]
+    index = CoverageIndex(files_frame(rows))
+    assert len(index.gaps('a', 'temp', '1 monthly')) == 1
+    assert index.covering('temp', '1 monthly', 1990, 1990) == set()
+    assert index.covering('temp', '1 monthly', 1990, 1990, allow_gaps=True) == {'a'}
+
+def test_sample_times_missing_month():
+    # Mid-month sample times, one file per month, with June missing
+    rows = [('a', 'temp', '1 monthly', '1990-{:02d}-16'.format(month), '1990-{:02d}-16'.format(month))
+            for month in range(1, 13) if month != 6]
+    index = CoverageIndex(files_frame(rows))
+    assert len(index.gaps('a', 'temp', '1 monthly')) == 1
+    assert index.covering('temp', '1 monthly', 1990, 1990) == set()
+
+def test_unknown_variable():
+    index = CoverageIndex(files_frame([]))
+    assert index.covering('temp', '1 monthly', 1990, 1999) == set()
+    assert index.segments('a', 'temp', '1 monthly') == []
+
+def overlap():
+    pairs = pd.DataFrame([('a', 'temp', '1 daily'), ('a', 'salt', '1 daily'),
+                          ('b', 'temp', '1 daily'), ('b', 'temp', '1 monthly')],
+                         columns=['experiment', 'name', 'frequency'])
+    return VariableOverlap(pairs)
+
+def test_overlap_matrix():
+    matrix = overlap().matrix(['a', 'b', 'empty'])
+    assert matrix.loc['a', 'a'] == 2
+    assert matrix.loc['a', 'b'] == 1
+    assert (matrix.loc['empty'] == 0).all()
+
+def test_overlap_difference():
+    difference = overlap().difference('a', 'b')
+    assert difference['common'].to_dict('records') == [{'name': 'temp', 'frequency': '1 daily'}]
+    assert list(difference['only_a'].name) == ['salt']
+    assert list(difference['only_b'].frequency) == ['1 monthly']
+
+def test_overlap_experiment_without_variables():
+    o = overlap()
+    assert 'empty' not in o
+    difference = o.difference('a', 'empty')
+    assert len(difference['common']) == 0 and len(difference['only_b']) == 0
+    assert len(difference['only_a']) == 2
+
+def experiment_catalog():
+    experiments = pd.DataFrame({'experiment': ['b_run', 'A_run', 'c_run'],
+                                'ncfiles': [10, 20, 30]})
+    variables = pd.DataFrame({'name': ['temp', 'salt', 'temp']},
+                             index=pd.Index(['b_run', 'b_run', 'A_run'], name='experiment'))
+    return ExperimentCatalog(experiments, variables)
+
+def test_experiment_catalog_lookup():
+    catalog = experiment_catalog()
+    assert 'A_run' in catalog and 'missing' not in catalog
+    assert len(catalog) == 3
+    assert list(catalog.get('c_run').ncfiles) == [30]
+    assert len(catalog.get('missing')) == 0
+    assert catalog.record('A_run') == {'experiment': 'A_run', 'ncfiles': 20}
+    assert catalog.record('missing') is None
+
+def test_experiment_catalog_sort():
+    catalog = experiment_catalog()
+    assert catalog.names == ['A_run', 'b_run', 'c_run']
+    assert catalog.sort(['zz_missing', 'c_run', 'A_run']) == ['A_run', 'c_run', 'zz_missing']
+
+def test_experiment_catalog_with_variable():
+    catalog = experiment_catalog()
+    assert catalog.with_variable('temp') == {'A_run', 'b_run'}
+    assert catalog.with_variable('salt') == {'b_run'}
+    assert catalog.with_variable('missing') == set()
+
+def test_variable_catalog():
+    variables = pd.DataFrame([('temp', '1 monthly', 'first'), ('temp', '1 daily', 'daily'),
+                              ('temp', '1 monthly', 'duplicate'), ('salt', '1 yearly', 'salt')],
+                             columns=['name', 'frequency', 'note'])
+    catalog = VariableCatalog(variables)
+    assert 'temp' in catalog and 'missing' not in catalog
+    assert catalog.frequencies('temp') == ['1 monthly', '1 daily']
+    assert catalog.frequencies('missing') == []
+    assert catalog.get('temp', '1 monthly')['note'] == 'first'
+    assert catalog.get('temp', '1 yearly') is None
+
+def test_variable_catalog_without_frequency():
+    catalog = VariableCatalog(pd.DataFrame({'name': ['temp']}))
+    assert 'temp' in catalog
+    assert catalog.frequencies('temp') == []
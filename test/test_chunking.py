@@ -0,0 +1,68 @@
+import pytest
+
+from data_explorer.chunking import choose_chunks, describe_layout
+
+def layout(shape, chunks, dims=('time', 'st_ocean', 'yt_ocean', 'xt_ocean'), itemsize=4,
+           compression=4):
+    return {
+        'dims': dims,
+        'shape': shape,
+        'chunks': chunks,
+        'itemsize': itemsize,
+        'compression': compression,
+        'time_dim': 'time',
+    }
+
+def nbytes(chunks, itemsize=4):
+    size = itemsize
+    for c in chunks.values():
+        size *= c
+    return size
+
+def test_chunked_layout_grows_spatial_first():
+    chunks = choose_chunks(layout((120, 50, 300, 360), (1, 7, 300, 360)), target_size=2**24)
+    # Whole levels are added before more time records
+    assert chunks == {'time': 1, 'st_ocean': 35, 'yt_ocean': 300, 'xt_ocean': 360}
+
+    chunks = choose_chunks(layout((120, 50, 300, 360), (1, 7, 300, 360)), target_size=2**27)
+    # All levels, then whole multiples of the time chunk
+    assert chunks == {'time': 6, 'st_ocean': 50, 'yt_ocean': 300, 'xt_ocean': 360}
+
+def test_contiguous_layout():
+    chunks = choose_chunks(layout((12, 300, 360), None, dims=('time', 'yt_ocean', 'xt_ocean')),
+                           target_size=2**22)
+    # Whole records, with as many as fit the target
+    assert chunks == {'time': 9, 'yt_ocean': 300, 'xt_ocean': 360}
+
+@pytest.mark.parametrize('target_size', [2**20, 2**23, 2**26])
+def test_target_size_cap(target_size):
+    native = (1, 1, 100, 100)
+    chunks = choose_chunks(layout((365, 50, 1000, 1000), native), target_size=target_size)
+    assert nbytes(chunks) <= max(target_size, nbytes(dict(enumerate(native))))
+
+def test_dims_not_multiple_of_native():
+    chunks = choose_chunks(layout((100, 50, 1000, 1000), (30, 7, 300, 300)), target_size=2**40)
+    # Capped at the size of each dimension, never past it
+    assert chunks == {'time': 100, 'st_ocean': 50, 'yt_ocean': 1000, 'xt_ocean': 1000}
+
+    chunks = choose_chunks(layout((100, 50, 1000, 1000), (30, 7, 300, 300)), target_size=2**26)
+    native = {'time': 30, 'st_ocean': 7, 'yt_ocean': 300, 'xt_ocean': 300}
+    shape = {'time': 100, 'st_ocean': 50, 'yt_ocean': 1000, 'xt_ocean': 1000}
+    for dim, size in chunks.items():
+        assert size % native[dim] == 0 or size == shape[dim]
+
+@pytest.mark.parametrize('target_size', [1, 2**10, 2**20])
+def test_never_smaller_than_native(target_size):
+    native = (1, 10, 100, 100)
+    chunks = choose_chunks(layout((12, 50, 300, 360), native), target_size=target_size)
+    assert all(c >= n for c, n in zip(chunks.values(), native))
+
+def test_native_larger_than_shape():
+    chunks = choose_chunks(layout((1, 50, 300, 360), (10, 50, 512, 512)), target_size=1)
+    assert chunks == {'time': 1, 'st_ocean': 50, 'yt_ocean': 300, 'xt_ocean': 360}
+
+def test_describe_layout():
+    assert describe_layout(layout((1, 2), None, dims=('time', 'x'), compression=0)) == \
+        'contiguous, uncompressed'
+    assert describe_layout(layout((1, 2), (1, 2), dims=('time', 'x'))) == \
+        "chunks {'time': 1, 'x': 2}, zlib level 4"
@@ -0,0 +1,32 @@
+import numpy as np
+import xarray as xr
+
+from data_explorer.cluster import ClusterManager
+
+class StubClient:
+
+    def __init__(self):
+        self.persisted = []
+
+    def persist(self, data):
+        self.persisted.append(data)
+        return data
+
+def manager(persist_threshold):
+    cluster = ClusterManager(persist_threshold=persist_threshold)
+    cluster._client = StubClient()
+    return cluster
+
+def test_lazy_by_default():
+    data = xr.DataArray(np.zeros(10), dims=['time'])
+    cluster = manager(None)
+    assert cluster.maybe_persist(data) is data
+    assert cluster._client.persisted == []
+
+def test_persist_below_threshold():
+    small = xr.DataArray(np.zeros(10), dims=['time'])
+    large = xr.DataArray(np.zeros(1000), dims=['time'])
+    cluster = manager(small.nbytes)
+    cluster.maybe_persist(small)
+    cluster.maybe_persist(large)
+    assert len(cluster._client.persisted) == 1 and cluster._client.persisted[0] is small
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from data_explorer import ensemble, loading
+from data_explorer.ensemble import _relabel_time, period_labels
+
+def series(times):
+    return xr.DataArray(np.arange(len(times)), dims=['time'], coords={'time': times})
+
+def test_monthly_labels_ignore_sampling_time():
+    mid_month = pd.date_range('1990-01-01', periods=3, freq='MS') + pd.Timedelta(days=15)
+    month_end = pd.date_range('1990-01-31', periods=3, freq='ME')
+    expected = ['1990-01', '1990-02', '1990-03']
+    assert list(period_labels(series(mid_month).time, '1 monthly')) == expected
+    assert list(period_labels(series(month_end).time, '1 monthly')) == expected
+
+def test_labels_ignore_calendar():
+    cftime = pytest.importorskip('cftime')
+    noleap = [cftime.DatetimeNoLeap(1990, m, 16) for m in (1, 2, 3)]
+    gregorian = [cftime.DatetimeGregorian(1990, m, 15, 12) for m in (1, 2, 3)]
+    assert (list(period_labels(series(noleap).time, '1 monthly')) ==
+            list(period_labels(series(gregorian).time, '1 monthly')))
+
+def test_multiple_period_labels():
+    times = pd.date_range('1990-01-01 01:30', periods=4, freq='3h')
+    assert list(period_labels(series(times).time, '3 hourly')) == [
+        '1990-01-01 00:00', '1990-01-01 03:00', '1990-01-01 06:00', '1990-01-01 09:00']
+
+    times = pd.date_range('1990-01-01', periods=4, freq='MS') + pd.Timedelta(days=15)
+    assert list(period_labels(series(times).time, '3 monthly')) == [
+        '1990-01', '1990-01', '1990-01', '1990-04']
+
+def test_unknown_frequency():
+    times = pd.date_range('1990-01-01', periods=2)
+    assert period_labels(series(times).time, 'fx') is None
+    assert (_relabel_time(series(times), 'time', 'fx').time.values == times.values).all()
+
+def test_relabel_not_unique():
+    times = pd.date_range('1990-01-01', periods=3)
+    with pytest.raises(ValueError):
+        _relabel_time(series(times), 'time', '1 monthly')
+
+class StubSession:
+
+    def get_bind(self):
+        return None
+
+class StubCache:
+
+    def __init__(self):
+        self.released = []
+
+    def key(self, key, fingerprint):
+        return key['experiment']
+
+    def release(self, keys):
+        self.released.extend(keys)
+
+def member(nx, x0=0.):
+    times = pd.date_range('1990-01-01', periods=3, freq='MS') + pd.Timedelta(days=15)
+    return xr.DataArray(np.ones((3, 2, nx)), dims=['time', 'yt_ocean', 'xt_ocean'],
+                        coords={'time': times, 'yt_ocean': [-10., 10.],
+                                'xt_ocean': x0 + np.arange(nx)})
+
+def test_mismatched_grids(monkeypatch):
+    # The first member is not on the most common grid
+    members = {'c': member(5), 'a': member(4), 'b': member(4), 'd': member(4, x0=0.5),
+               'e': member(4)}
+
+    def load_member(engine, selection, cache, pool):
+        return members[selection['experiment']]
+
+    monkeypatch.setattr(ensemble, '_load_member', load_member)
+    monkeypatch.setattr(loading, 'database_fingerprint', lambda session: None)
+    cache = StubCache()
+    data, failures = ensemble.load_ensemble(StubSession(), list(members), 'temp', '1 monthly',
+                                            '1990-01-01', '1990-04-01', cache=cache)
+
+    assert list(data.experiment.values) == ['a', 'b', 'e']
+    assert data.sizes == {'experiment': 3, 'time': 3, 'yt_ocean': 2, 'xt_ocean': 4}
+    assert (data.xt_ocean.values == np.arange(4)).all()
+    assert sorted(failures) == ['c', 'd']
+    assert 'Grid' in failures['c'] and 'xt_ocean' in failures['d']
+    assert sorted(cache.released) == ['c', 'd']
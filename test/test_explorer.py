@@ -0,0 +1,110 @@
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ipywidgets = pytest.importorskip('ipywidgets')
+
+from data_explorer import explorer
+from data_explorer.catalog import ExperimentCatalog
+
+experiments = pd.DataFrame({'experiment': ['expt_a', 'expt_b'],
+                            'contact': None, 'email': None, 'ncfiles': 1,
+                            'created': None, 'description': None, 'notes': None,
+                            'url': None, 'root_dir': None})
+
+variables = pd.DataFrame({'name': ['temp', 'salt'],
+                          'long_name': ['Temperature', 'Salinity'],
+                          'model': pd.Categorical(['ocean', 'ocean']),
+                          'restart': [False, False],
+                          'coordinate': [False, False]},
+                         index=pd.Index(['expt_a', 'expt_a'], name='experiment'))
+
+class StubDatabaseExtension:
+    """
+    Stand in for DatabaseExtension without a database
+    """
+
+    def __init__(self, session=None, experiments=None):
+        self.session = session
+        self.allexperiments = globals()['experiments']
+        self.experiments = self.allexperiments
+        self.keywords = ['cosima', 'ryf']
+        self.variables = variables.reset_index(drop=True)
+        self.catalog = ExperimentCatalog(self.experiments, variables)
+
+    def get_variables(self, experiment, frequency=None):
+        return pd.DataFrame({'name': ['temp', 'salt', 'temp'],
+                             'long_name': ['Temperature', 'Salinity', 'Temperature'],
+                             'frequency': ['1 monthly', '1 monthly', '1 daily'],
+                             'ncfile': ['a.nc', 'a.nc', 'b.nc'],
+                             '# ncfiles': [1, 1, 1],
+                             'time_start': ['1990-01-01'] * 3,
+                             'time_end': ['1990-12-31'] * 3})
+
+    def get_ncfile(self, experiment, variable, frequency=None):
+        return None
+
+@pytest.fixture
+def stubbed(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'cosima_cookbook', types.ModuleType('cosima_cookbook'))
+    monkeypatch.setattr(explorer, 'DatabaseExtension', StubDatabaseExtension)
+
+def registry_size():
+    from ipywidgets.widgets.widget import _instances
+    return len(_instances)
+
+def test_experiment_explorer_close_releases_widgets(stubbed):
+    # Create once first, so widgets created on first use are not counted
+    explorer.ExperimentExplorer(session=None, experiment='expt_a').close()
+    start = registry_size()
+    for _ in range(5):
+        ee = explorer.ExperimentExplorer(session=None, experiment='expt_a')
+        ee.close()
+        # close may be called again, e.g. from __del__
+        ee.close()
+    assert registry_size() == start
+
+def test_database_explorer_close_releases_widgets(stubbed):
+    explorer.DatabaseExplorer(de=StubDatabaseExtension()).close()
+    start = registry_size()
+    for _ in range(5):
+        de = explorer.DatabaseExplorer(de=StubDatabaseExtension())
+        de.widgets['expt_selector'].value = 'expt_a'
+        de._load_experiment(None)
+        de.close()
+    assert registry_size() == start
+
+def test_depth_slider_snaps_to_levels(stubbed, monkeypatch):
+    axes = {'X': ('xt_ocean', np.linspace(-280, 80, 10)),
+            'Z': ('st_ocean', np.array([5., 15., 30., 100., 500.]))}
+    ee = explorer.ExperimentExplorer(session=None, experiment='expt_a')
+    monkeypatch.setattr(ee, '_coordinate_axes', lambda variable, frequency: axes)
+    ee._subset_eventhandler(None)
+
+    depth = ee.subset_widgets['Z']
+    assert not depth.disabled and ee.subset_widgets['Y'].disabled
+    assert [value for _, value in depth.options] == [5., 15., 30., 100., 500.]
+    assert depth.value == (5., 500.)
+
+    depth.index = (1, 3)
+    assert ee._selection()['isel'] == {'st_ocean': [1, 4]}
+    ee.close()
+
+def test_save_job_needs_selection(stubbed, monkeypatch, tmp_path):
+    ee = explorer.ExperimentExplorer(session=None, experiment='expt_a')
+    path = tmp_path / 'jobs.json'
+    ee.widgets['job_file'].value = str(path)
+
+    ee._save_job(None)
+    assert 'Select a variable' in ee.widgets['data_box'].value
+    assert not path.exists()
+
+    monkeypatch.setattr(ee.widgets['var_selector'], 'get_selected', lambda: 'salt')
+    ee.widgets['daterange'].disabled = True
+    ee._save_job(None)
+    assert 'date range' in ee.widgets['data_box'].value
+    assert not path.exists()
+    ee.close()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from data_explorer.filepool import FilePool
+
+def sample(path, time0=0, n=3):
+    return xr.Dataset({'temp': (('time', 'xt_ocean'), np.full((n, 4), float(time0)))},
+                      coords={'time': np.arange(time0, time0 + n), 'xt_ocean': np.arange(4)},
+                      attrs={'path': path})
+
+@pytest.fixture
+def opened(monkeypatch):
+    """
+    Stand in for xarray.open_dataset, which builds each file in memory and
+    records the paths which are opened and closed
+    """
+    record = {'opened': [], 'closed': []}
+
+    def open_dataset(path, chunks=None):
+        record['opened'].append(path)
+        ds = sample(path, time0=int(path.split('.')[0]) * 10).chunk(chunks)
+        ds.set_close(lambda: record['closed'].append(path))
+        return ds
+
+    monkeypatch.setattr(xr, 'open_dataset', open_dataset)
+    return record
+
+def test_hits_and_misses(opened):
+    pool = FilePool(maxsize=4)
+    a = pool.open('1.nc')
+    assert pool.open('1.nc') is a
+    pool.open('2.nc')
+    # Different chunks are pooled separately
+    pool.open('1.nc', chunks={'time': 1})
+    assert (pool.hits, pool.misses) == (1, 3)
+    assert opened['opened'] == ['1.nc', '2.nc', '1.nc']
+    assert len(pool) == 3
+
+def test_lru_eviction_closes(opened):
+    pool = FilePool(maxsize=2)
+    pool.open('1.nc')
+    evicted = pool.open('2.nc')['temp']
+    # Using 1.nc makes 2.nc the least recently used
+    pool.open('1.nc')
+    pool.open('3.nc')
+    assert opened['closed'] == ['2.nc']
+    assert len(pool) == 2
+    assert float(evicted.mean()) == 20
+
+    pool.open('2.nc')
+    assert opened['closed'] == ['2.nc', '1.nc']
+    assert opened['opened'] == ['1.nc', '2.nc', '3.nc', '2.nc']
+
+    pool.clear()
+    assert sorted(opened['closed']) == ['1.nc', '2.nc', '2.nc', '3.nc']
+    assert len(pool) == 0
+
+def test_open_variable_concat(opened):
+    pool = FilePool()
+    data = pool.open_variable(['1.nc', '2.nc', '3.nc'], 'temp', chunks={'time': 1})
+    assert data.sizes == {'time': 9, 'xt_ocean': 4}
+    assert list(data.time.values) == list(range(10, 13)) + list(range(20, 23)) + list(range(30, 33))
+    assert data.chunks[0] == (1,) * 9
+    assert float(data.isel(time=4, xt_ocean=0)) == 20
+
+    assert pool.open_variable(['1.nc'], 'temp').identical(pool.open('1.nc')['temp'])
+    with pytest.raises(ValueError):
+        pool.open_variable([], 'temp')
+
+def test_open_variable_not_time_varying(opened):
+    pool = FilePool()
+    data = pool.open_variable(['1.nc', '2.nc'], 'xt_ocean')
+    assert data.sizes == {'xt_ocean': 4}
+
+def test_evicted_data_computes(tmp_path):
+    pytest.importorskip('netCDF4')
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / '{}.nc'.format(i))
+        sample(path, time0=i * 10).to_netcdf(path)
+        paths.append(path)
+
+    pool = FilePool(maxsize=1)
+    data = pool.open_variable(paths, 'temp')
+    # Only the last file is still open in the pool
+    assert len(pool) == 1
+    assert float(data.isel(time=0, xt_ocean=0)) == 0
+    assert float(data.mean()) == 10
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from data_explorer.loading import date_options
+from data_explorer.prefetch import adjacent_windows, candidate_selections
+
+dates = date_options('1 daily', '1990-01-01', '1990-12-31')
+
+def selection(start, end, frequency='1 daily'):
+    return {
+        'experiment': 'a',
+        'variable': 'temp',
+        'frequency': frequency,
+        'start_time': str(pd.Timestamp(start)),
+        'end_time': str(pd.Timestamp(end)),
+        'chunks': {'time': 1},
+        'isel': {'xt_ocean': [0, 10]},
+    }
+
+def test_adjacent_windows_on_slider_options():
+    windows = adjacent_windows(selection('1990-02-01', '1990-02-11'), dates, count=2)
+    assert [(w['start_time'][:10], w['end_time'][:10]) for w in windows] == [
+        ('1990-02-11', '1990-02-21'),
+        ('1990-01-22', '1990-02-01'),
+        ('1990-02-21', '1990-03-03'),
+        ('1990-01-12', '1990-01-22'),
+    ]
+    options = set(str(d) for d in dates)
+    assert all(w['start_time'] in options and w['end_time'] in options for w in windows)
+
+def test_adjacent_windows_clipped_to_options():
+    assert adjacent_windows(selection('1990-01-01', '1990-12-31'), dates) == []
+    windows = adjacent_windows(selection('1990-01-01', '1990-01-10'), dates)
+    assert [w['start_time'][:10] for w in windows] == ['1990-01-10']
+
+def test_adjacent_windows_not_an_option():
+    assert adjacent_windows(selection('1990-01-01 12:00', '1990-01-10'), dates) == []
+
+def test_other_frequencies_use_default_selection():
+    yearly = pd.DatetimeIndex(['1990-01-01', '1991-01-01', '1992-01-01'])
+    candidates = candidate_selections(selection('1990-02-01', '1990-02-11'), dates,
+                                      {'1 daily': dates, '1 yearly': yearly})
+    other = [c for c in candidates if c['frequency'] == '1 yearly']
+    assert other == [dict(selection('1990-01-01', '1992-01-01', '1 yearly'), chunks=None, isel={})]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from data_explorer.subset import (apply_index_selection, coordinate_axis, index_range,
+                                  index_selection, isel_command, time_dimension)
+
+depths = np.array([5., 15., 30., 100., 500.])
+
+@pytest.mark.parametrize('lower, upper, expected', [
+    (5., 500., (0, 5)),
+    (10., 100., (1, 4)),
+    (15., 15., (1, 2)),
+    (0., 1000., (0, 5)),
+    (501., 1000., (5, 5)),
+])
+def test_index_range_increasing(lower, upper, expected):
+    assert index_range(depths, lower, upper) == expected
+
+@pytest.mark.parametrize('lower, upper, expected', [
+    (-90., 90., (0, 5)),
+    (-10., 45., (1, 4)),
+    (0., 0., (2, 3)),
+    (60., 90., (0, 0)),
+])
+def test_index_range_decreasing(lower, upper, expected):
+    latitudes = np.array([50., 45., 0., -10., -60.])
+    start, stop = index_range(latitudes, lower, upper)
+    assert (start, stop) == expected
+    assert all(lower <= v <= upper for v in latitudes[start:stop])
+
+def test_index_range_single_value():
+    assert index_range([10.], 0., 20.) == (0, 1)
+    assert index_range([10.], 11., 20.) == (1, 1)
+
+def test_index_selection():
+    axes = {'X': ('xt_ocean', np.linspace(-280, 80, 361)),
+            'Y': ('yt_ocean', np.linspace(80, -80, 161)),
+            'Z': ('st_ocean', depths)}
+    ranges = {'X': (-280., 80.), 'Y': (-10., 10.), 'Z': (0., 30.), 'T': (0, 1)}
+    # The whole longitude range, and axes without coordinates, are left out
+    assert index_selection(axes, ranges) == {'yt_ocean': [70, 91], 'st_ocean': [0, 3]}
+    assert index_selection(axes, {}) == {}
+
+def test_apply_index_selection():
+    data = xr.DataArray(np.arange(20).reshape(4, 5), dims=['time', 'st_ocean'])
+    isel = {'st_ocean': [1, 3]}
+    assert apply_index_selection(data, isel).shape == (4, 2)
+    assert apply_index_selection(data, {}) is data
+    assert isel_command(isel) == '.isel(st_ocean=slice(1, 3))'
+    assert isel_command({}) == ''
+
+def test_coordinate_axis():
+    assert coordinate_axis(xr.DataArray([0.], attrs={'axis': 'x'})) == 'X'
+    assert coordinate_axis(xr.DataArray([0.], attrs={'units': 'degrees_N'})) == 'Y'
+    assert coordinate_axis(xr.DataArray([0.], attrs={'positive': 'down'})) == 'Z'
+    assert coordinate_axis(xr.DataArray([0.], attrs={'units': 'days'})) is None
+
+def test_time_dimension():
+    assert time_dimension(xr.DataArray(np.zeros((1, 2)), dims=['time_0', 'x'])) == 'time_0'
+    assert time_dimension(xr.DataArray(np.zeros(2), dims=['x'])) is None